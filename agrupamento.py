@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from classificacao import quebras
+from estilo import codigos_bins, estilizar_pontos
+
+# Agrupamento dos locais de votação numa grade regular em Web Mercator, com
+# células de tamanho fixo na tela (TAMANHO_CELULA_PX) para cada nível de
+# zoom. As somas de votos por célula são pré-calculadas para todos os níveis
+# de uma vez; o mapa recebe só as células do zoom atual, então o número de
+# elementos desenhados depende da área visível e não do número de locais
+# (ou seções).
+
+RAIO_TERRA = 6378137.0
+TAMANHO_TILE_PX = 256
+TAMANHO_CELULA_PX = 48
+ZOOMS_AGRUPAMENTO = [9, 10, 11, 12, 13, 14]
+
+
+def mercator(lon, lat):
+    x = np.radians(np.asarray(lon, dtype=np.float64)) * RAIO_TERRA
+    y = np.log(np.tan(np.pi / 4 + np.radians(np.asarray(lat, dtype=np.float64)) / 2)) * RAIO_TERRA
+    return x, y
+
+
+def tamanho_celula(zoom, tamanho_px=TAMANHO_CELULA_PX):
+    # Metros de Web Mercator por pixel no zoom, vezes o tamanho da célula
+    return 2 * np.pi * RAIO_TERRA / (TAMANHO_TILE_PX * 2 ** zoom) * tamanho_px
+
+
+# Soma das colunas por célula da grade do zoom; lon/lat de cada célula é o
+# centro dos locais ponderado pelos votos aptos
+def agrupar(df, colunas, zoom, tamanho_px=TAMANHO_CELULA_PX):
+    x, y = mercator(df['lon'], df['lat'])
+    tamanho = tamanho_celula(zoom, tamanho_px)
+    celula = (np.floor(x / tamanho).astype(np.int64) << 32) | (np.floor(y / tamanho).astype(np.int64) & 0xFFFFFFFF)
+    celulas, grupo = np.unique(celula, return_inverse=True)
+
+    peso = df['VOTOS APTOS'].to_numpy(dtype=np.float64) + 1  # +1: locais sem aptos ainda contam
+    soma_peso = np.bincount(grupo, weights=peso)
+    dados = {
+        'lon': np.bincount(grupo, weights=df['lon'].to_numpy(dtype=np.float64) * peso) / soma_peso,
+        'lat': np.bincount(grupo, weights=df['lat'].to_numpy(dtype=np.float64) * peso) / soma_peso,
+        'n_locais': np.bincount(grupo, minlength=len(celulas)),
+    }
+    for col in dict.fromkeys(colunas):
+        dados[col] = np.bincount(grupo, weights=df[col].to_numpy(dtype=np.float64), minlength=len(celulas)).astype(np.int64)
+    return pd.DataFrame(dados)
+
+
+def precalcular_grades(df, colunas, zooms=ZOOMS_AGRUPAMENTO):
+    colunas = list(dict.fromkeys(list(colunas) + ['VOTOS APTOS']))
+    return {zoom: agrupar(df, colunas, zoom) for zoom in zooms}
+
+
+# Tabela da camada de células: valor (soma ou % dos aptos da célula), raio em
+# metros no chão (cabe dentro da célula) e cor pelo bin do valor
+def dados_agrupados(grade, voto, proporcao, zoom, num_bins=5, metodo='iguais'):
+    if proporcao:
+        aptos = grade['VOTOS APTOS'].to_numpy(dtype=np.float64)
+        valor = np.round(np.divide(grade[voto].to_numpy(dtype=np.float64) * 100, aptos,
+                                   out=np.zeros(len(aptos)), where=aptos > 0), 1)
+    else:
+        valor = grade[voto].to_numpy(dtype=np.float64)
+    bins = quebras(valor, num_bins, metodo)
+    _, cor = estilizar_pontos(codigos_bins(valor, bins), len(bins) - 1)
+
+    dados = grade[['lon', 'lat', 'n_locais']].copy()
+    dados['valor'] = valor
+    # Escala do Mercator na latitude: converte o tamanho da célula em metros reais
+    dados['radius'] = 0.45 * tamanho_celula(zoom) * np.cos(np.radians(grade['lat'].to_numpy()))
+    dados[['cor_r', 'cor_g', 'cor_b', 'cor_a']] = cor
+    return dados, bins
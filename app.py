@@ -5,55 +5,82 @@ import pydeck as pdk
 import altair as alt
 import plotly.express as px
 import numpy as np
+import os
+import time
+
+from atualizador import Atualizador, assinatura
+from agrupamento import ZOOMS_AGRUPAMENTO, dados_agrupados, precalcular_grades
+from cache_resultados import normalizar_chave, resultados
+from comparacao import construir_comparacao, eleicoes_configuradas
+from classificacao import METODOS, rotulos
+from coropletico import contornos, dados_coropleticos, ler_nivel, nivel_para_zoom, valores_por_bairro
+from cubo import construir_cubo
+from esquema import TIPO_PROPORCAO
+from etapas import CORES_VARIACAO, preparar_comparacao, preparar_locais, preparar_vencedores
+from estilo import cores_bins, raios_bins
+from graficos import criar_grafico_distribuicao, criar_graficos, especificacao, hash_filtros
+from mapa import camada_pontos, camadas_mvt, montar_dados_mapa
+from metricas import percentual
+from perfil import Perfil, contar_execucoes, perfil_ativo
+from secoes import existe_base_secoes, secoes_do_local, tabela_secoes
+from votos_longos import de_tabela_larga
 
 # 1. Configuração da página
 st.set_page_config(page_title="Painel de Votação - Curitiba", layout="wide")
 
+# Servidor de tiles vetoriais do modo MVT (servidor_tiles.py)
+URL_TILES = os.environ.get('PAINEL_TILES_URL', 'http://localhost:8765')
+
+# Perfil opcional da execução (PAINEL_PERFIL=1 ou ?perfil=1 na URL). O
+# perfil da execução anterior da sessão fica em session_state: se ela foi
+# interrompida antes de perfil.fim(), as medições abertas são descartadas
+if 'perfil' in st.session_state:
+    st.session_state['perfil'].descartar()
+perfil = st.session_state['perfil'] = Perfil(perfil_ativo(st.query_params))
+
 # 2. Título do painel
 st.title("Dados de Votação para Prefeitura de Curitiba - Primeiro Turno")
 
 # 3. Carregamento dos dados
-@st.cache_data
-def load_data(votes_path, geojson_path):
-    # Carregar dados de votação
-    df_votes = pd.read_csv(votes_path, dtype={'zon_loc': str})
-    
-    # Separar 'zon_loc' em 'zona_eleitoral' e 'local_votacao'
-    df_votes[['zona_eleitoral', 'local_votacao']] = df_votes['zon_loc'].str.split('_', expand=True)
-    
-    # Carregar dados geográficos
-    gdf = gpd.read_file(geojson_path)
-    gdf['zon_loc'] = gdf['zon_loc'].astype(str)
-    
-    # Unir dados de votação com geográficos
-    df_merged = df_votes.merge(gdf, on='zon_loc')
-    
-    # Garantir que estamos lidando com um GeoDataFrame
-    if not isinstance(df_merged, gpd.GeoDataFrame):
-        df_merged = gpd.GeoDataFrame(df_merged, geometry='geometry')
-    
-    # Definir CRS para WGS 84 (EPSG:4326)
-    df_merged = df_merged.set_crs("EPSG:4326", allow_override=True)
-    
-    return df_merged
+# Um único atualizador por processo: carrega a base (sem cópia por sessão) e
+# a mantém atualizada numa thread em segundo plano, trocando o instantâneo
+# de uma vez quando chegam novos resultados
+@st.cache_resource
+@contar_execucoes
+def load_atualizador(votes_path, geojson_path):
+    return Atualizador(votes_path, geojson_path).iniciar()
 
 # Caminhos dos arquivos
 votes_csv = 'votos_cwb_pref1T_locvot.csv'
 geojson_file = 'locais_votacao.geojson'
 
 # Carregar os dados
-df = load_data(votes_csv, geojson_file)
+perfil.secao('carregamento')
+atualizador = perfil.chamada_cacheada(load_atualizador, votes_csv, geojson_file)
+# O instantâneo é lido uma única vez por execução: uma troca no meio do
+# script só vale a partir da próxima execução. O DataFrame é somente leitura.
+instantaneo = atualizador.atual()
+df = instantaneo.df
+versao_dados = instantaneo.versao
 
 # 4. Filtros na Barra Lateral
+perfil.secao('barra_lateral')
 st.sidebar.header("Filtros")
+st.sidebar.caption(
+    f"Dados: versão {versao_dados}, carregada às {time.strftime('%H:%M:%S', time.localtime(instantaneo.criado_em))}"
+)
+
+# Base longa (local, votável, votos) da versão atual dos dados: os tipos de
+# voto oferecidos saem dela, sem lista fixa de candidatos
+@st.cache_resource(max_entries=2)
+@contar_execucoes
+def load_votos_longos(_df, versao):
+    return de_tabela_larga(_df)
+
+votos_longos = perfil.chamada_cacheada(load_votos_longos, df, versao_dados)
 
 # Filtro de Tipo de Voto (Quantidades e Candidatos)
-opcoes_votos = [
-    'VOTOS APTOS','ABSTENÇÕES','VOTOS NOMINAIS', 'VOTO BRANCO', 'VOTO NULO',
-    'CRISTINA REIS GRAEML', 'EDUARDO PIMENTEL SLAVIERO', 'FELIPE GUSTAVO BOMBARDELLI',
-    'LUCIANO DUCCI', 'LUIZ GOULARTE ALVES', 'MARIA VICTORIA BORGHETTI BARROS',
-    'NEY LEPREVOST NETO', 'ROBERTO REQUIÃO DE MELLO E SILVA', 'SAMUEL DE MATTOS FIGUEIREDO'
-]
+opcoes_votos = votos_longos.opcoes()
 voto_selecionado = st.sidebar.selectbox("Selecione o Tipo de Voto:", options=opcoes_votos)
 
 # Novo seletor: Absoluto ou Proporção
@@ -62,6 +89,44 @@ modo_visualizacao = st.sidebar.radio(
     options=["Números Absolutos", "Proporção (%)"]
 )
 
+# Classificação dos valores em faixas, a mesma no mapa, nas legendas e no
+# gráfico de distribuição
+metodo_faixas = METODOS[st.sidebar.selectbox("Faixas de valores:", options=list(METODOS))]
+
+# Modo do mapa: pontos por local de votação ou coroplético por bairro
+modo_mapa = st.sidebar.radio(
+    "Mapa:",
+    options=["Locais de Votação", "Bairros (coroplético)", "Agrupado (grade por zoom)", "Tiles vetoriais (MVT)",
+             "Vencedor por local", "Comparação entre eleições"]
+)
+# Alinhamento das eleições pelo local de votação, montado uma vez por
+# conjunto de arquivos; trocar o par comparado não refaz junções
+@st.cache_resource(max_entries=2)
+@contar_execucoes
+def load_comparacao(eleicoes, assinaturas):
+    return construir_comparacao(dict(eleicoes))
+
+if modo_mapa == "Agrupado (grade por zoom)":
+    zoom_mapa = st.sidebar.select_slider(
+        "Zoom do agrupamento:", options=ZOOMS_AGRUPAMENTO, value=10
+    )
+elif modo_mapa == "Comparação entre eleições":
+    eleicoes = eleicoes_configuradas()
+    if len(eleicoes) >= 2:
+        assinaturas_eleicoes = tuple(assinatura(caminho) for caminho in eleicoes.values())
+        comparacao = perfil.chamada_cacheada(load_comparacao, tuple(eleicoes.items()), assinaturas_eleicoes)
+        eleicao_a = st.sidebar.selectbox("Eleição de referência:", options=comparacao.eleicoes, index=0)
+        eleicao_b = st.sidebar.selectbox("Comparar com:", options=comparacao.eleicoes, index=1)
+        opcoes_a, opcoes_b = comparacao.opcoes(eleicao_a), comparacao.opcoes(eleicao_b)
+        votavel_a = st.sidebar.selectbox(
+            f"Votável em {eleicao_a}:", options=opcoes_a,
+            index=opcoes_a.index(voto_selecionado) if voto_selecionado in opcoes_a else 0
+        )
+        votavel_b = st.sidebar.selectbox(
+            f"Votável em {eleicao_b}:", options=opcoes_b,
+            index=opcoes_b.index(votavel_a) if votavel_a in opcoes_b else 0
+        )
+
 # Filtro por Zona Eleitoral
 zonas = sorted(df['zona_eleitoral'].unique())
 zona_selecionada = st.sidebar.multiselect(
@@ -74,88 +139,47 @@ bairro_selecionado = st.sidebar.multiselect(
     "Selecione o(s) Bairro(s):", options=bairros, default=bairros
 )
 
-# 5. Aplicação dos Filtros nos Dados
-df_filtrado = df[df['zona_eleitoral'].isin(zona_selecionada)]
-df_filtrado = df_filtrado[df_filtrado['BAIRRO'].isin(bairro_selecionado)]
-
-# 6. Aplicar lógica para proporção ou absoluto
-if modo_visualizacao == "Proporção (%)":
-    # Evitar divisão por zero
-    valor_exibido = voto_selecionado + " (%)" 
-    df_filtrado[valor_exibido] = np.where(
-        df_filtrado['VOTOS APTOS'] > 0,
-        round((df_filtrado[voto_selecionado] / df_filtrado['VOTOS APTOS']) * 100, 1),
-        0
-    )
-    titulo_valor = "Proporção em Relação aos Votos Aptos"
-    # Remover possíveis valores negativos ou NaN
-    df_filtrado[valor_exibido] = df_filtrado[valor_exibido].fillna(0)
-else:
-    valor_exibido = voto_selecionado
-    df_filtrado[valor_exibido] = df_filtrado[voto_selecionado].fillna(0)
-    titulo_valor = "Quantidade de " + voto_selecionado
-
-# 7. Implementação da Escala Automática para Radius com Legenda Integrada
-# Definir os intervalos (bins) para valor_exibido com verificação
-num_bins = 5  # Número de categorias para a legenda
-
-unique_vals = df_filtrado[valor_exibido].nunique()
-
-if unique_vals > 1:
-    bins = np.linspace(df_filtrado[valor_exibido].min(), df_filtrado[valor_exibido].max(), num_bins + 1)
-    labels = [f"{round(bins[i],2)} - {round(bins[i+1],2)}" for i in range(num_bins)]
-    try:
-        df_filtrado['bin'] = pd.cut(df_filtrado[valor_exibido], bins=bins, labels=labels, include_lowest=True, duplicates='drop')
-    except ValueError:
-        # Caso ainda ocorram bins duplicados, definir manualmente
-        df_filtrado['bin'] = 'Valor Único'
-        labels = ['Valor Único']
-else:
-    # Todos os valores são iguais; criar um único bin
-    bins = [df_filtrado[valor_exibido].min(), df_filtrado[valor_exibido].max()]
-    labels = [f"{df_filtrado[valor_exibido].min()}"]
-    df_filtrado['bin'] = pd.cut(df_filtrado[valor_exibido], bins=bins, labels=labels, include_lowest=True)
-
-if unique_vals > 1:
-    # Definir um mapeamento de bins para tamanhos de bolinhas
-    radius_mapping = {
-        label: size for label, size in zip(labels, np.linspace(150, 1100, len(labels)))
-    }
-    # Definir um mapeamento de bins para cores
-    paleta_cores = [
-        (0, 128, 255,220),      # Azul claro
-        (0, 100, 200,220),
-        (0, 80, 180,220),
-        (0, 60, 160,220),
-        (0, 40, 140,220)        # Azul escuro
-    ]
-    color_mapping = {
-        label: cor for label, cor in zip(labels, paleta_cores)
-    }
-else:
-    # Caso todos os valores sejam iguais, usar uma cor intermediária
-    radius_mapping = {labels[0]: 650}  # Média entre 200 e 550
-    paleta_cores = [
-        (0, 128, 255,200)      # Azul claro
-    ]
-    color_mapping = {labels[0]: (0, 128, 255,220)}  # Azul intermediário
+# Cubo (zona x bairro) com as somas de cada tipo de voto
+# (um por versão dos dados; _df não entra na chave do cache)
+@st.cache_resource(max_entries=2)
+@contar_execucoes
+def load_cubo(_df, versao):
+    return construir_cubo(_df, opcoes_votos)
 
-if isinstance(df_filtrado.index, pd.MultiIndex):
-    df_filtrado = df_filtrado.reset_index()  # Remove MultiIndex do DataFrame.
+cubo = perfil.chamada_cacheada(load_cubo, df, versao_dados)
 
-df_filtrado['bin'] = df_filtrado['bin'].astype(str)
+# Seções de um único local de votação, lidas sob demanda da base
+# particionada por zona (não carrega as demais seções no processo)
+@st.cache_data(max_entries=256)
+@contar_execucoes
+def load_secoes(nr_zona, nr_local_votacao, versao, opcoes):
+    return tabela_secoes(secoes_do_local(nr_zona, nr_local_votacao), opcoes)
 
-# Atribuir o tamanho da bolinha com base no bin
-df_filtrado['radius'] = df_filtrado['bin'].map(radius_mapping)
+# Contornos simplificados dos bairros de um nível de zoom pré-calculado
+@st.cache_resource
+@contar_execucoes
+def load_contornos(zoom):
+    return contornos(ler_nivel(zoom))
 
-# Atribuir a cor com base no bin
-df_filtrado['color'] = df_filtrado['bin'].map(color_mapping)
+# 5-7. Filtros, valor exibido (absoluto ou proporção) e escala automática
+# do raio/cor dos pontos. O resultado vem do cache compartilhado entre
+# sessões, pela chave normalizada dos filtros, e é somente leitura
+perfil.secao('filtros')
+num_bins = 5  # Número de categorias para a legenda
+df_filtrado, valor_exibido, titulo_valor, bins, labels = resultados.obter(
+    normalizar_chave('locais', versao_dados, voto_selecionado, modo_visualizacao, zona_selecionada, bairro_selecionado,
+                     metodo_faixas),
+    lambda: preparar_locais(df, voto_selecionado, modo_visualizacao, zona_selecionada, bairro_selecionado, num_bins,
+                            metodo_faixas)
+)
 
-# Verificar se há alguma cor não mapeada e atribuir cor padrão
-if df_filtrado['color'].isnull().any():
-    df_filtrado['color'] = df_filtrado['color'].apply(lambda x: (0, 128, 255) if pd.isnull(x) else x)
+# Mapeamentos de bins para tamanhos e cores, usados nas legendas
+radius_mapping = dict(zip(labels, raios_bins(len(labels))))
+paleta_cores = cores_bins(len(labels))
+color_mapping = dict(zip(labels, paleta_cores))
 
 # 8. Funções para gerar legendas
+perfil.secao('legendas')
 def gerar_legenda_tamanho(radius_mapping_leg):
     legenda_html = "<div style='margin-top:10px;'>"
     legenda_html += "<h4>Legenda do Tamanho das Bolinhas</h4>"
@@ -198,7 +222,7 @@ def gerar_legenda_cores(color_mapping):
     return legenda_html
 
 # Gerar a legenda de tamanho das bolinhas
-if unique_vals > 1:
+if len(labels) > 1:
     radius_mapping_leg = {
         label: size for label, size in zip(labels, np.linspace(5, 30, len(labels)))
     }
@@ -211,124 +235,40 @@ legenda_tamanho = gerar_legenda_tamanho(radius_mapping_leg)
 legenda_cores = gerar_legenda_cores(color_mapping)
 
 # 9. Criação dos Gráficos
-def criar_graficos(df, valor_exibido, titulo_valor, modo_visualizacao):
-    if modo_visualizacao == "Proporção (%)":
-        # Agregar somatório por bairro e calcular a proporção
-        df_agrupado = df.groupby('BAIRRO').agg({
-            voto_selecionado: 'sum',
-            'VOTOS APTOS': 'sum'
-        }).reset_index()
-        df_agrupado['Proporção (%)'] = (df_agrupado[voto_selecionado] / df_agrupado['VOTOS APTOS']) * 100
-        grafico_barras = alt.Chart(df_agrupado).mark_bar().encode(
-            x=alt.X('BAIRRO:N', title="Bairro"),
-            y=alt.Y('Proporção (%)', title="Proporção (%)"),
-            color=alt.Color('BAIRRO:N', legend=None),
-            tooltip=['BAIRRO', 'Proporção (%)']
-        ).properties(
-            width=600,
-            height=400,
-            title='Proporção de Votos por Bairro'
-        ).configure_axis(
-            labelFontSize=12,
-            titleFontSize=14
-        ).configure_title(
-            fontSize=16
-        )
-        
-        grafico_pizza = px.pie(
-            df_agrupado, 
-            values='Proporção (%)', 
-            names='BAIRRO', 
-            title=f"Distribuição de Proporção (%) por Bairro",
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
-    else:
-        # Agregar somatório por bairro
-        df_agrupado = df.groupby('BAIRRO').agg({
-            voto_selecionado: 'sum'
-        }).reset_index()
-        grafico_barras = alt.Chart(df_agrupado).mark_bar().encode(
-            x=alt.X('BAIRRO:N', title="Bairro"),
-            y=alt.Y(voto_selecionado, title=titulo_valor),
-            color=alt.Color('BAIRRO:N', legend=None),
-            tooltip=['BAIRRO', voto_selecionado]
-        ).properties(
-            width=600,
-            height=400,
-            title='Quantidade de Votos por Bairro'
-        ).configure_axis(
-            labelFontSize=12,
-            titleFontSize=14
-        ).configure_title(
-            fontSize=16
-        )
-        
-        grafico_pizza = px.pie(
-            df_agrupado, 
-            values=voto_selecionado, 
-            names='BAIRRO', 
-            title=f"Distribuição de {titulo_valor} por Bairro",
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
-    
-    return grafico_barras, grafico_pizza
+# Os gráficos são montados sob demanda, ao serem exibidos, e reaproveitados
+# entre sessões pela chave (gráfico, versão dos dados, tipo de voto, modo, filtros)
+filtros_hash = hash_filtros(zona_selecionada, bairro_selecionado)
 
-# Criar os gráficos de barra e pizza
-grafico_barras, grafico_pizza = criar_graficos(df_filtrado, valor_exibido, titulo_valor, modo_visualizacao)
+def grafico_barras():
+    return especificacao(
+        ('barras', versao_dados, voto_selecionado, modo_visualizacao, filtros_hash),
+        lambda: criar_graficos(cubo, zona_selecionada, bairro_selecionado, voto_selecionado, titulo_valor, modo_visualizacao)
+    )
 
 # 10. Adicionar Gráfico de Distribuição de Locais por Faixa de Valores
-def criar_grafico_distribuicao(df, valor_exibido):
-    # Definir as faixas (bins) e labels para distribuição
-    distrib_bins = bins # [0, 10, 25, 50, 75, 100]  # Ajuste conforme necessário
-    distrib_labels = labels #['0-10%', '10-25%', '25-50%', '50-75%', '75-100%']
-    
-    # Categorizar os dados
-    df['faixa_distribuicao'] = pd.cut(
-        df[valor_exibido], 
-        bins=distrib_bins, 
-        labels=distrib_labels, 
-        include_lowest=True
+def grafico_distribuicao():
+    return especificacao(
+        ('distribuicao', versao_dados, voto_selecionado, modo_visualizacao, metodo_faixas, filtros_hash),
+        lambda: criar_grafico_distribuicao(df_filtrado, valor_exibido, bins, labels)
     )
-    
-    # Contar o número de locais por faixa
-    df_distribuicao = df['faixa_distribuicao'].value_counts().reset_index()
-    df_distribuicao.columns = ['Faixa de Valores', 'Número de Locais']
-    #df_distribuicao = df_distribuicao.sort_values(by='Faixa de Valores')
-    
-    # Criar o gráfico de barras
-    grafico_distribuicao = alt.Chart(df_distribuicao).mark_bar().encode(
-        x=alt.X('Faixa de Valores:O', title='Faixa de Valores'),
-        y=alt.Y('Número de Locais:Q', title='Número de Locais'),
-        color=alt.Color('Faixa de Valores:O', legend=None),
-        tooltip=['Faixa de Valores', 'Número de Locais']
-    ).properties(
-        width=600,
-        height=400,
-        title='Distribuição de Locais de Votação por Faixa de Valores'
-    ).configure_axis(
-        labelFontSize=12,
-        titleFontSize=14
-    ).configure_title(
-        fontSize=16
-    )
-    
-    return grafico_distribuicao
-
-# Criar o gráfico de distribuição
-grafico_distribuicao = criar_grafico_distribuicao(df_filtrado, valor_exibido)
 
 # 11. Verificar se há pontos disponíveis
 if df_filtrado.empty:
     st.warning("Nenhum dado encontrado para os filtros selecionados.")
 else:
     # 12. Organizar o Layout em Containers e Colunas
+    perfil.secao('indicadores')
     st.header("Visualizações Interativas")
     
     # Container para Indicadores Principais
     with st.container():
         st.markdown("### Indicadores Principais")
-        total_votos = df_filtrado[voto_selecionado].sum()
-        total_aptos = df_filtrado['VOTOS APTOS'].sum()
+        totais = resultados.obter(
+            normalizar_chave('totais', versao_dados, voto_selecionado, zona_selecionada, bairro_selecionado),
+            lambda: cubo.totais(zona_selecionada, bairro_selecionado, [voto_selecionado, 'VOTOS APTOS'])
+        )
+        total_votos = totais[voto_selecionado]
+        total_aptos = totais['VOTOS APTOS']
         percentual_total = (total_votos / total_aptos * 100) if total_aptos > 0 else 0
         
         col1, col2, col3 = st.columns(3)
@@ -343,25 +283,108 @@ else:
         col1, col2 = st.columns([3, 1])  # Mapa ocupa mais espaço que a legenda
         with col1:
             # 13. Criação do Mapa Interativo
+            perfil.secao('mapa')
             st.subheader("Mapa das Localidades de Votação")
             
-            # Extrair coordenadas X e Y da geometria
-            df_filtrado = df_filtrado.copy()  # Evita SettingWithCopyWarning
-            df_filtrado['lon'] = df_filtrado.geometry.x
-            df_filtrado['lat'] = df_filtrado.geometry.y
-            
-            # Definir a camada do mapa com cores dinâmicas
-            layer = pdk.Layer(
-                "ScatterplotLayer",
-                data=df_filtrado,
-                get_position='[lon, lat]',
-                get_fill_color='color',
-                get_line_color=[0, 0, 0],  # Bordas pretas
-                get_line_width= 10,
-                get_radius="radius",
-                pickable=True,
-                auto_highlight=True
-            )
+            if modo_mapa == "Bairros (coroplético)":
+                # Vista ajustada aos locais filtrados; o nível de simplificação
+                # dos contornos segue o zoom dessa vista (o st.pydeck_chart não
+                # devolve ao script o zoom escolhido no navegador)
+                zoom_mapa = 10
+                if not df_filtrado.empty:
+                    zoom_mapa = pdk.data_utils.compute_view(df_filtrado[['lon', 'lat']].to_numpy().tolist(),
+                                                            view_proportion=1).zoom
+                # Soma por polígono de bairro sobre a geometria pré-simplificada
+                valores = resultados.obter(
+                    normalizar_chave('bairros', versao_dados, voto_selecionado, modo_visualizacao, zona_selecionada, bairro_selecionado),
+                    lambda: valores_por_bairro(df_filtrado, voto_selecionado, modo_visualizacao == "Proporção (%)")
+                )
+                contornos_nivel = perfil.chamada_cacheada(load_contornos, nivel_para_zoom(zoom_mapa))
+                dados_mapa = dados_coropleticos(contornos_nivel, valores, metodo=metodo_faixas)
+                layers = [pdk.Layer(
+                    "PolygonLayer",
+                    data=dados_mapa,
+                    get_polygon='contorno',
+                    get_fill_color='[cor_r, cor_g, cor_b, cor_a]',
+                    get_line_color=[255, 255, 255],
+                    line_width_min_pixels=1,
+                    pickable=True,
+                    auto_highlight=True
+                )]
+                tooltip_html = f"Bairro: {{NOME}}<br/>{titulo_valor}: {{valor}}"
+            elif modo_mapa == "Agrupado (grade por zoom)":
+                # Somas por célula pré-calculadas para todos os zooms (uma vez
+                # por filtro, no cache compartilhado); só as do zoom vão ao mapa
+                grades = resultados.obter(
+                    normalizar_chave('grades', versao_dados, zona_selecionada, bairro_selecionado),
+                    lambda: precalcular_grades(df_filtrado, opcoes_votos)
+                )
+                dados_mapa, bins_celulas = dados_agrupados(grades[zoom_mapa], voto_selecionado,
+                                                           modo_visualizacao == "Proporção (%)", zoom_mapa,
+                                                           metodo=metodo_faixas)
+                layers = [pdk.Layer(
+                    "ScatterplotLayer",
+                    data=dados_mapa,
+                    get_position='[lon, lat]',
+                    get_fill_color='[cor_r, cor_g, cor_b, cor_a]',
+                    get_line_color=[0, 0, 0],
+                    line_width_min_pixels=1,
+                    get_radius='radius',
+                    pickable=True,
+                    auto_highlight=True
+                )]
+                tooltip_html = f"Locais na célula: {{n_locais}}<br/>{titulo_valor}: {{valor}}"
+                st.caption(f"{len(dados_mapa)} células; faixas: " + ", ".join(rotulos(bins_celulas)))
+            elif modo_mapa == "Tiles vetoriais (MVT)":
+                # O navegador busca só os tiles visíveis no servidor_tiles.py;
+                # os tiles trazem todos os locais (sem os filtros da barra lateral)
+                layers = camadas_mvt(URL_TILES, voto_selecionado, modo_visualizacao == "Proporção (%)",
+                                     bins, paleta_cores, raios_bins(len(labels)))
+                tooltip_html = f"Zona: {{zona}}<br/>Local: {{local}}<br/>Bairro: {{bairro}}<br/>{voto_selecionado}: {{votos}}"
+                st.caption(f"Tiles de {URL_TILES} (python servidor_tiles.py); os filtros de zona e bairro não se aplicam.")
+            elif modo_mapa == "Vencedor por local":
+                # Vencedor e margem já vêm da base (metricas.py); o estilo
+                # fica no cache compartilhado, por filtro
+                dados_mapa, cores_vencedores, labels_margem = resultados.obter(
+                    normalizar_chave('vencedores', versao_dados, zona_selecionada, bairro_selecionado, metodo_faixas),
+                    lambda: preparar_vencedores(df_filtrado, num_bins, metodo_faixas)
+                )
+                layers = [camada_pontos(dados_mapa)]
+                tooltip_html = ("Zona: {zona_eleitoral}<br/>Local: {local_votacao}<br/>Vencedor: {VENCEDOR}<br/>"
+                                "Segundo: {SEGUNDO}<br/>Margem: {MARGEM} votos ({MARGEM (% VÁLIDOS)}% dos válidos)")
+                st.caption("Raio pela margem sobre o segundo colocado (% dos válidos): " + ", ".join(labels_margem))
+            elif modo_mapa == "Comparação entre eleições":
+                if len(eleicoes) < 2:
+                    layers = []
+                    tooltip_html = ""
+                    st.info("A comparação precisa de pelo menos duas eleições com arquivo consolidado "
+                            "(ex.: votos_cwb_pref2T_locvot.csv, gerado por votos.py, incremental.py ou lote.py), "
+                            "ou da variável PAINEL_ELEICOES=\"rótulo=arquivo;...\".")
+                else:
+                    dados_mapa, variacao_bairros, labels_variacao = resultados.obter(
+                        normalizar_chave('comparacao', assinaturas_eleicoes, eleicao_a, votavel_a, eleicao_b, votavel_b,
+                                         modo_visualizacao, zona_selecionada, bairro_selecionado, metodo_faixas),
+                        lambda: preparar_comparacao(comparacao, df_filtrado, eleicao_a, votavel_a, eleicao_b, votavel_b,
+                                                    modo_visualizacao == "Proporção (%)", num_bins, metodo_faixas)
+                    )
+                    layers = [camada_pontos(dados_mapa)]
+                    unidade = " p.p." if modo_visualizacao == "Proporção (%)" else " votos"
+                    tooltip_html = (f"Zona: {{zona_eleitoral}}<br/>Local: {{local_votacao}}<br/>Bairro: {{BAIRRO}}<br/>"
+                                    f"{eleicao_a}: {{valor_a}}<br/>{eleicao_b}: {{valor_b}}<br/>Variação: {{variacao}}{unidade}")
+                    st.caption(f"{len(dados_mapa)} locais presentes nas duas eleições; raio pela variação "
+                               f"absoluta ({unidade.strip()}): " + ", ".join(labels_variacao))
+                    st.dataframe(variacao_bairros.rename(columns={
+                        'valor_a': f"{votavel_a} ({eleicao_a})", 'valor_b': f"{votavel_b} ({eleicao_b})",
+                        'variacao': f"Variação ({unidade.strip()})",
+                    }), hide_index=True)
+            else:
+                # Apenas as colunas usadas pela camada e pelo tooltip
+                # (coordenadas lon/lat já vêm do cache de dados)
+                dados_mapa = montar_dados_mapa(df_filtrado, ['radius', 'cor_r', 'cor_g', 'cor_b', 'cor_a'], ['zona_eleitoral', 'local_votacao', valor_exibido])
+
+                # Definir a camada do mapa com cores dinâmicas
+                layers = [camada_pontos(dados_mapa)]
+                tooltip_html = f"Zona: {{zona_eleitoral}}<br/>Local: {{local_votacao}}<br/>{titulo_valor}: {{{valor_exibido}}}"
         
             # Definir o estilo do mapa base
             map_style = "light"  # Altere conforme desejado
@@ -376,17 +399,17 @@ else:
             view_state = pdk.ViewState(
                 longitude=midpoint[0],
                 latitude=midpoint[1],
-                zoom=10,  # Zoom fixo para manter a proporcionalidade
+                zoom=zoom_mapa if modo_mapa in ("Bairros (coroplético)", "Agrupado (grade por zoom)") else 10,  # Zoom fixo para manter a proporcionalidade
                 pitch=0
             )
         
             # Renderização do mapa
             r = pdk.Deck(
-                layers=[layer],
+                layers=layers,
                 initial_view_state=view_state,
                 map_style=map_style,  # Aplicar o estilo do mapa
                 tooltip={
-                    "html": f"Zona: {{zona_eleitoral}}<br/>Local: {{local_votacao}}<br/>{titulo_valor}: {{{valor_exibido}}}",
+                    "html": tooltip_html,
                     "style": {"backgroundColor": "steelblue", "color": "white"}
                 }
             )
@@ -410,7 +433,12 @@ else:
             </div>
             """
             # Legenda para o tamanho das bolinhas
-            st.markdown(legenda_cor + legenda_tamanho, unsafe_allow_html=True)
+            if modo_mapa == "Vencedor por local":
+                st.markdown(gerar_legenda_cores(cores_vencedores), unsafe_allow_html=True)
+            elif modo_mapa == "Comparação entre eleições":
+                st.markdown(gerar_legenda_cores(CORES_VARIACAO), unsafe_allow_html=True)
+            else:
+                st.markdown(legenda_cor + legenda_tamanho, unsafe_allow_html=True)
             
             # Nota sobre o zoom fixo
             st.markdown("""
@@ -420,17 +448,53 @@ else:
             """, unsafe_allow_html=True)
     
     # Container para Gráficos
+    perfil.secao('graficos_render')
     with st.container():
         # Gráfico de Barras por Bairro
         st.subheader("Distribuição dos Votos por Bairro")
-        st.altair_chart(grafico_barras, use_container_width=True)
+        st.vega_lite_chart(grafico_barras(), use_container_width=True)
         
         # Gráfico de Distribuição de Locais por Faixa de Valores
         st.subheader("Distribuição de Número de Locais de Votação por Faixa de Valores")
-        st.altair_chart(grafico_distribuicao, use_container_width=True)
+        st.vega_lite_chart(grafico_distribuicao(), use_container_width=True)
     
     # Container para Tabela Dinâmica
+    perfil.secao('tabela')
     with st.container():
         st.subheader(f"Dados das Localidades de Votação - {titulo_valor}")
-        colunas_exibir = ['zona_eleitoral', 'local_votacao', valor_exibido, 'BAIRRO']
-        st.dataframe(df_filtrado[colunas_exibir].reset_index(drop=True))
+        colunas_exibir = ['zona_eleitoral', 'local_votacao', valor_exibido, 'BAIRRO', 'VENCEDOR', 'MARGEM (% VÁLIDOS)']
+        tabela_locais = df_filtrado[colunas_exibir].reset_index(drop=True)
+        # Selecionar uma linha abre o detalhamento por seção do local
+        evento_tabela = st.dataframe(tabela_locais, on_select="rerun", selection_mode="single-row", key="tabela_locais")
+        linhas_selecionadas = evento_tabela.selection.rows
+
+    # 14. Detalhamento por Seção do local selecionado na tabela
+    perfil.secao('secoes')
+    with st.container():
+        st.subheader("Detalhamento por Seção Eleitoral")
+        if not existe_base_secoes():
+            st.info("Base de seções não encontrada. Gere-a com: python secoes.py votacao_secao-zona_2024_pr_curitiba.csv")
+        elif not linhas_selecionadas:
+            st.caption("Selecione um local de votação na tabela acima para ver os votos de cada seção.")
+        else:
+            local = tabela_locais.iloc[linhas_selecionadas[0]]
+            df_secoes = perfil.chamada_cacheada(load_secoes, int(local['zona_eleitoral']), int(local['local_votacao']), versao_dados,
+                                                 tuple(opcoes_votos))
+            st.markdown(f"**Zona {local['zona_eleitoral']} - Local {local['local_votacao']} ({local['BAIRRO']})**")
+            if df_secoes.empty:
+                st.warning("Nenhuma seção encontrada para este local de votação.")
+            else:
+                colunas_secao = list(dict.fromkeys(['nr_secao', 'VOTOS APTOS', voto_selecionado]))
+                if modo_visualizacao == "Proporção (%)":
+                    # Mesma fórmula e tipo da proporção por local (metricas.py)
+                    df_secoes[valor_exibido] = percentual(
+                        df_secoes[voto_selecionado], df_secoes['VOTOS APTOS']
+                    ).astype(TIPO_PROPORCAO)
+                    colunas_secao.append(valor_exibido)
+                st.dataframe(df_secoes[colunas_secao + [c for c in df_secoes.columns if c not in colunas_secao]],
+                             hide_index=True)
+
+# Encerrar o perfil e exibir o painel de depuração
+perfil.fim()
+perfil.emitir_log()
+perfil.mostrar(st)
@@ -6,6 +6,12 @@ import altair as alt
 import plotly.express as px
 import numpy as np
 
+from classificacao import classificar
+from dados import carregar_dados
+from estilo import codigos_bins, cor_votavel, estilizar_pontos, raios_bins
+from mapa import montar_dados_mapa
+from votos_longos import de_tabela_larga
+
 # 1. Configuração da página
 st.set_page_config(page_title="Painel de Votação - Curitiba", layout="wide")
 
@@ -15,27 +21,13 @@ st.title("Dados de Votação para Prefeitura de Curitiba - Primeiro Turno")
 # 3. Carregamento dos dados
 @st.cache_data
 def load_data(votes_path, geojson_path):
-    # Carregar dados de votação
-    df_votes = pd.read_csv(votes_path, dtype={'zon_loc': str})
-    
-    # Separar 'zon_loc' em 'zona_eleitoral' e 'local_votacao'
-    df_votes[['zona_eleitoral', 'local_votacao']] = df_votes['zon_loc'].str.split('_', expand=True)
-    
-    # Carregar dados geográficos
-    gdf = gpd.read_file(geojson_path)
-    gdf['zon_loc'] = gdf['zon_loc'].astype(str)
-    
-    # Unir dados de votação com geográficos
-    df_merged = df_votes.merge(gdf, on='zon_loc')
-    
-    # Garantir que estamos lidando com um GeoDataFrame
-    if not isinstance(df_merged, gpd.GeoDataFrame):
-        df_merged = gpd.GeoDataFrame(df_merged, geometry='geometry')
-    
-    # Definir CRS para WGS 84 (EPSG:4326)
-    df_merged = df_merged.set_crs("EPSG:4326", allow_override=True)
-    
-    return df_merged
+    # Ler o cache GeoParquet (ou gerá-lo, se estiver desatualizado)
+    return carregar_dados(votes_path, geojson_path)
+
+# Base longa (local, votável, votos), de onde saem os tipos de voto
+@st.cache_resource
+def load_votos_longos(votes_path, geojson_path):
+    return de_tabela_larga(load_data(votes_path, geojson_path))
 
 # Caminhos dos arquivos
 votes_csv = 'votos_cwb_pref1T_locvot.csv'
@@ -48,12 +40,7 @@ df = load_data(votes_csv, geojson_file)
 st.sidebar.header("Filtros")
 
 # Filtro de Tipo de Voto (Quantidades e Candidatos)
-opcoes_votos = [
-    'VOTOS APTOS','ABSTENÇÕES','VOTOS NOMINAIS', 'VOTO BRANCO', 'VOTO NULO',
-    'CRISTINA REIS GRAEML', 'EDUARDO PIMENTEL SLAVIERO', 'FELIPE GUSTAVO BOMBARDELLI',
-    'LUCIANO DUCCI', 'LUIZ GOULARTE ALVES', 'MARIA VICTORIA BORGHETTI BARROS',
-    'NEY LEPREVOST NETO', 'ROBERTO REQUIÃO DE MELLO E SILVA', 'SAMUEL DE MATTOS FIGUEIREDO'
-]
+opcoes_votos = load_votos_longos(votes_csv, geojson_file).opcoes()
 voto_selecionado = st.sidebar.selectbox("Selecione o Tipo de Voto:", options=opcoes_votos)
 
 # Novo seletor: Absoluto ou Proporção
@@ -74,7 +61,8 @@ bairro_selecionado = st.sidebar.multiselect(
     "Selecione o(s) Bairro(s):", options=bairros, default=bairros
 )
 
-# Dicionário de cores por tipo de voto/candidato
+# Cores escolhidas para alguns tipos de voto/candidatos; os demais recebem
+# uma cor gerada a partir do nome
 cores_votos = {
     'VOTOS APTOS': [34, 139, 34],  # Verde
     'ABSTENÇÕES': [255, 0, 0],  # Vermelho
@@ -90,11 +78,10 @@ cores_votos = {
     'NEY LEPREVOST NETO': [155, 15, 90], 
     'ROBERTO REQUIÃO DE MELLO E SILVA': [55, 120, 220], 
     'SAMUEL DE MATTOS FIGUEIREDO': [5, 165, 60]
-    # Adicione cores para os demais candidatos...
 }
 
 # Obter a cor correspondente ao tipo de voto selecionado
-cor_selecionada = cores_votos.get(voto_selecionado, [0, 128, 255])  # Default Azul
+cor_selecionada = cores_votos.get(voto_selecionado) or cor_votavel(voto_selecionado)
 
 # 5. Aplicação dos Filtros nos Dados
 df_filtrado = df[df['zona_eleitoral'].isin(zona_selecionada)]
@@ -102,16 +89,9 @@ df_filtrado = df_filtrado[df_filtrado['BAIRRO'].isin(bairro_selecionado)]
 
 # Aplicar lógica para proporção ou absoluto
 if modo_visualizacao == "Proporção (%)":
-    # Evitar divisão por zero
+    # Proporção já calculada na base (metricas.py)
     valor_exibido = voto_selecionado + " (%)" 
-    df_filtrado[valor_exibido] = np.where(
-        df_filtrado['VOTOS APTOS'] > 0,
-        round((df_filtrado[voto_selecionado] / df_filtrado['VOTOS APTOS']) * 100, 1),
-        0
-    )
     titulo_valor = "Proporção em Relação aos Votos Aptos"
-    # Remover possíveis valores negativos ou NaN
-    df_filtrado[valor_exibido] = df_filtrado[valor_exibido].fillna(0)
 else:
     valor_exibido = voto_selecionado
     df_filtrado[valor_exibido] = df_filtrado[voto_selecionado].fillna(0)
@@ -135,19 +115,19 @@ if (valor_exibido == 'VOTOS APTOS (%)'):
     num_bins = 1  # Número de categorias para a legenda
 else:
     num_bins = 5  # Número de categorias para a legenda
-bins = np.linspace(0.01, df_filtrado[valor_exibido].max(), num_bins + 1)
-labels = [f"{round(bins[i],2)} - {round(bins[i+1],2)}" for i in range(num_bins)]
-df_filtrado['bin'] = pd.cut(df_filtrado[valor_exibido], bins=bins, labels=labels, include_lowest=True)
+# (a partir do menor valor, de modo que locais com zero também entram no mapa)
+bins, labels = classificar(df_filtrado[valor_exibido].to_numpy(), num_bins)
+num_bins = len(labels)
 
 # Definir um mapeamento de bins para tamanhos de bolinhas
-radius_mapping = {
-    label: size for label, size in zip(labels, np.linspace(150, 1100, num_bins))
-}
+radius_mapping = dict(zip(labels, raios_bins(num_bins)))
 radius_mapping_leg = {
     label: size for label, size in zip(labels, np.linspace(5, 30, num_bins))
 }
-# Atribuir o tamanho da bolinha com base no bin
-df_filtrado['radius'] = df_filtrado['bin'].map(radius_mapping)
+# Atribuir o tamanho da bolinha com base no bin (pontos fora dos bins, com
+# código -1, ficam com o raio padrão)
+codigos = codigos_bins(df_filtrado[valor_exibido].to_numpy(), bins)
+df_filtrado['radius'], _ = estilizar_pontos(codigos, num_bins)
 
 # Função para gerar a legenda de tamanho das bolinhas
 def gerar_legenda_tamanho(radius_mapping):
@@ -233,21 +213,19 @@ else:
             # 10. Criação do Mapa Interativo
             st.subheader("Mapa das Localidades de Votação")
             
-            # Extrair coordenadas X e Y da geometria
-            df_filtrado = df_filtrado.copy()  # Evita SettingWithCopyWarning
-            df_filtrado['lon'] = df_filtrado.geometry.x
-            df_filtrado['lat'] = df_filtrado.geometry.y
-            
             # Garantir que a coluna selecionada existe e é numérica
             if voto_selecionado not in df_filtrado.columns:
                 st.error(f"A coluna '{voto_selecionado}' não existe nos dados.")
             elif not pd.api.types.is_numeric_dtype(df_filtrado[voto_selecionado]):
                 st.error(f"A coluna '{voto_selecionado}' não é numérica.")
             else:
+                # Apenas as colunas usadas pela camada e pelo tooltip
+                dados_mapa = montar_dados_mapa(df_filtrado, ['radius'], ['zona_eleitoral', 'local_votacao', valor_exibido])
+                
                 # Definir a camada do mapa
                 layer = pdk.Layer(
                     "ScatterplotLayer",
-                    data=df_filtrado,
+                    data=dados_mapa,
                     get_position='[lon, lat]',
                     get_fill_color=cor_selecionada + [180],  # Adicionar transparência
                     get_line_color=[0, 0, 0],  # Bordas pretas
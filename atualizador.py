@@ -0,0 +1,144 @@
+import logging
+import os
+import shutil
+import threading
+import time
+
+from bairros import DIVISA_BAIRROS
+from dados import carregar_dados
+from incremental import atualizar_incremental
+
+# Atualização dos dados em segundo plano, fora do caminho das requisições.
+# Uma thread do processo verifica periodicamente a pasta de entrada (novos
+# arquivos de votação por seção do TSE) e as fontes da base unida (CSV de
+# votos, GeoJSON, divisa de bairros). Quando há mudança, aplica a publicação
+# com a reagregação incremental, reconstrói a base unida e troca de uma vez
+# o instantâneo servido aos painéis. Cada execução do script pega o
+# instantâneo atual uma única vez, então sessões em andamento continuam com
+# a versão anterior até terminar, e nunca veem dados pela metade.
+#
+# Arquivos (na entrada ou nas fontes) só são lidos depois de ficarem uma
+# verificação inteira sem mudar de tamanho nem de data, para não pegar uma
+# cópia ainda em andamento.
+#
+# Só um processo deve processar a pasta de entrada (o painel); os demais
+# (servidor_tiles.py) usam pasta_entrada=None e apenas recarregam a base
+# quando as fontes mudam.
+
+PASTA_ENTRADA = os.environ.get('PAINEL_ENTRADA', 'entrada')
+PASTA_PROCESSADOS = 'processados'
+INTERVALO_SEGUNDOS = float(os.environ.get('PAINEL_INTERVALO_ATUALIZACAO', 30))
+
+logger = logging.getLogger('painel.atualizador')
+
+
+# 'fontes': assinaturas dos arquivos de origem lidas antes da carga
+class Instantaneo:
+    def __init__(self, versao, df, fontes=None):
+        self.versao = versao
+        self.df = df
+        self.fontes = fontes or {}
+        self.criado_em = time.time()
+
+
+def assinatura(caminho):
+    try:
+        estado = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return estado.st_size, estado.st_mtime_ns
+
+
+class Atualizador:
+    def __init__(self, votes_path, geojson_path, pasta_entrada=PASTA_ENTRADA,
+                 intervalo=INTERVALO_SEGUNDOS, bairros_path=DIVISA_BAIRROS):
+        self.votes_path = votes_path
+        self.geojson_path = geojson_path
+        self.bairros_path = bairros_path
+        self.pasta_entrada = pasta_entrada
+        self.intervalo = intervalo
+        self.ultimo_erro = None
+        self._parar = threading.Event()
+        self._thread = None
+        self._vistos = {}  # caminho -> assinatura na verificação anterior
+
+        # A primeira versão é carregada na criação (uma vez por processo)
+        self._fontes = self._assinaturas_fontes()
+        self._instantaneo = Instantaneo(1, carregar_dados(votes_path, geojson_path, bairros_path=bairros_path),
+                                        self._fontes)
+
+    # Leitura de um único atributo: a troca em trocar() é atômica
+    def atual(self):
+        return self._instantaneo
+
+    def _assinaturas_fontes(self):
+        return {caminho: assinatura(caminho) for caminho in (self.votes_path, self.geojson_path, self.bairros_path)}
+
+    def _estavel(self, caminho):
+        atual = assinatura(caminho)
+        anterior = self._vistos.get(caminho)
+        self._vistos[caminho] = atual
+        return atual is not None and atual == anterior
+
+    def _arquivos_prontos(self):
+        if self.pasta_entrada is None or not os.path.isdir(self.pasta_entrada):
+            return []
+        candidatos = sorted(
+            (entrada.stat().st_mtime_ns, entrada.path) for entrada in os.scandir(self.pasta_entrada)
+            if entrada.is_file() and entrada.name.lower().endswith('.csv')
+        )
+        return [caminho for _, caminho in candidatos if self._estavel(caminho)]
+
+    def _arquivar(self, caminho):
+        destino = os.path.join(self.pasta_entrada, PASTA_PROCESSADOS)
+        os.makedirs(destino, exist_ok=True)
+        shutil.move(caminho, os.path.join(destino, os.path.basename(caminho)))
+        self._vistos.pop(caminho, None)
+
+    def trocar(self, df, fontes=None):
+        self._instantaneo = Instantaneo(self._instantaneo.versao + 1, df, fontes)
+        logger.info("dados atualizados para a versão %d (%d locais)", self._instantaneo.versao, len(df))
+
+    # Uma verificação completa; devolve True se uma nova versão foi publicada
+    def verificar(self):
+        processados = 0
+        for caminho in self._arquivos_prontos():
+            afetados = atualizar_incremental(caminho, self.votes_path)
+            logger.info("%s: %d locais de votação atualizados", caminho, afetados)
+            self._arquivar(caminho)
+            processados += 1
+
+        fontes = self._assinaturas_fontes()
+        if fontes == self._fontes:
+            return False
+        # Fonte alterada por fora (o CSV reescrito pelo notebook, por
+        # exemplo): espera uma verificação sem novas mudanças
+        estaveis = [self._estavel(caminho) for caminho in fontes]
+        if not processados and not all(estaveis):
+            return False
+        df = carregar_dados(self.votes_path, self.geojson_path, bairros_path=self.bairros_path)
+        self._fontes = fontes
+        self.trocar(df, fontes)
+        return True
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.verificar()
+                self.ultimo_erro = None
+            except Exception as erro:
+                # Mantém o instantâneo anterior e tenta de novo na próxima vez
+                logger.exception("falha ao atualizar os dados")
+                self.ultimo_erro = erro
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name='atualizador-dados', daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,41 @@
+import geopandas as gpd
+import numpy as np
+import shapely
+
+# Atribuição espacial de pontos (locais de votação ou seções geocodificadas)
+# aos polígonos de DIVISA_DE_BAIRROS, em lote, com índice STRtree. Pontos que
+# caem fora de todos os polígonos (divisas, erros de geocodificação) recebem
+# o polígono mais próximo.
+
+DIVISA_BAIRROS = 'DIVISA_DE_BAIRROS.shp'
+CRS_MAPA = "EPSG:4326"
+
+
+def ler_bairros(caminho=DIVISA_BAIRROS):
+    return gpd.read_file(caminho).to_crs(CRS_MAPA)
+
+
+def indice_bairros(bairros):
+    return shapely.STRtree(bairros.geometry.values)
+
+
+# Devolve, para cada ponto, a posição do polígono de bairro que o contém
+def atribuir_bairros(lon, lat, bairros, arvore=None):
+    arvore = arvore or indice_bairros(bairros)
+    pontos = shapely.points(np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+
+    posicao = np.full(len(pontos), -1, dtype=np.int64)
+    idx_ponto, idx_bairro = arvore.query(pontos, predicate='within')
+    # Em divisas um ponto pode cair em dois polígonos; fica o primeiro
+    idx_ponto, primeiro = np.unique(idx_ponto, return_index=True)
+    posicao[idx_ponto] = idx_bairro[primeiro]
+
+    sem_bairro = np.flatnonzero(posicao < 0)
+    if len(sem_bairro):
+        idx_ponto, idx_bairro = arvore.query_nearest(pontos[sem_bairro], return_distance=False, all_matches=False)
+        posicao[sem_bairro[idx_ponto]] = idx_bairro
+    return posicao
+
+
+def nomes_bairros(lon, lat, bairros, coluna='NOME'):
+    return bairros[coluna].to_numpy()[atribuir_bairros(lon, lat, bairros)]
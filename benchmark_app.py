@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+
+from cubo import construir_cubo
+from dados import carregar_dados
+from estilo import codigos_bins, estilizar_pontos
+from classificacao import classificar
+from etapas import calcular_valor_exibido, filtrar_locais
+from graficos import criar_grafico_distribuicao, criar_graficos
+from mapa import camada_pontos, montar_dados_mapa
+from metricas import calcular_metricas
+from votos_longos import de_tabela_larga
+
+# Benchmark do caminho carga -> filtro -> bins -> gráficos -> mapa do painel
+# (app.py) sobre bases sintéticas 1x, 10x, 100x e 1000x maiores que
+# votos_cwb_pref1T_locvot.csv. Cada etapa é medida separadamente (tempo e
+# pico de memória via tracemalloc) e o resultado sai em JSON para comparar
+# entre commits:
+#   python benchmark_app.py --escalas 1 10 100 --saida bench.json
+
+VOTOS_CSV = 'votos_cwb_pref1T_locvot.csv'
+LOCAIS_GEOJSON = 'locais_votacao.geojson'
+VOTO_BENCH = 'EDUARDO PIMENTEL SLAVIERO'
+MODO_BENCH = "Proporção (%)"
+
+# Os números de local das cópias são deslocados para não colidir
+DESLOCAMENTO_LOCAL = 10_000
+
+
+def gerar_base_sintetica(escala, pasta, votes_path=VOTOS_CSV, geojson_path=LOCAIS_GEOJSON, semente=0):
+    rng = np.random.default_rng(semente)
+    votos = pd.read_csv(votes_path, dtype={'zon_loc': str})
+    locais = gpd.read_file(geojson_path)
+    colunas_votos = votos.columns.drop(['zon_loc', 'nr_local_votacao', 'nr_zona'])
+
+    copias_votos, copias_locais = [votos], [locais]
+    validos = locais[~locais['zon_loc'].str.endswith('_')]
+    for i in range(1, escala):
+        copia = votos.copy()
+        copia['nr_local_votacao'] += i * DESLOCAMENTO_LOCAL
+        copia['zon_loc'] = copia['nr_zona'].astype(str).str.cat(copia['nr_local_votacao'].astype(str), sep='_')
+        fator = rng.uniform(0.8, 1.2, size=(len(copia), 1))
+        copia[colunas_votos] = np.round(copia[colunas_votos].to_numpy() * fator).astype('int64')
+        copias_votos.append(copia)
+
+        copia_locais = validos.copy()
+        zona, local = copia_locais['zon_loc'].str.split('_', expand=True).T.to_numpy()
+        copia_locais['zon_loc'] = [f"{z}_{int(l) + i * DESLOCAMENTO_LOCAL}" for z, l in zip(zona, local)]
+        deslocamento = rng.normal(0, 0.01, size=(len(copia_locais), 2))
+        copia_locais['geometry'] = gpd.points_from_xy(
+            copia_locais.geometry.x + deslocamento[:, 0], copia_locais.geometry.y + deslocamento[:, 1]
+        )
+        copias_locais.append(copia_locais)
+
+    destino_votos = os.path.join(pasta, f'votos_{escala}x.csv')
+    destino_locais = os.path.join(pasta, f'locais_{escala}x.geojson')
+    pd.concat(copias_votos, ignore_index=True).to_csv(destino_votos, index=False, encoding='utf-8')
+    gpd.GeoDataFrame(pd.concat(copias_locais, ignore_index=True), crs=locais.crs).to_file(destino_locais, driver='GeoJSON')
+    return destino_votos, destino_locais
+
+
+def medir(nome, funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    # Pico de memória medido numa execução à parte, sem distorcer os tempos
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return resultado, {
+        'etapa': nome,
+        'tempo_min_s': min(tempos),
+        'tempo_mediano_s': float(np.median(tempos)),
+        'pico_memoria_mb': pico / 2**20,
+    }
+
+
+def medir_escala(escala, pasta, repeticoes):
+    votes_path, geojson_path = gerar_base_sintetica(escala, pasta)
+    cache = os.path.join(pasta, f'cache_{escala}x.parquet')
+    medicoes = []
+
+    def carga_fria():
+        if os.path.exists(cache):
+            os.remove(cache)
+        return carregar_dados(votes_path, geojson_path, cache)
+
+    _, m = medir('load_data_frio', carga_fria, 1)
+    medicoes.append(m)
+    df, m = medir('load_data', lambda: carregar_dados(votes_path, geojson_path, cache), repeticoes)
+    medicoes.append(m)
+
+    zonas = sorted(df['zona_eleitoral'].unique())[1:]
+    bairros = sorted(df['BAIRRO'].unique())
+
+    df_filtrado, m = medir('filtro_zona_bairro', lambda: filtrar_locais(df, zonas, bairros), repeticoes)
+    medicoes.append(m)
+
+    # As proporções são calculadas na montagem do cache (metricas.py) e
+    # calcular_valor_exibido só lê a coluna; a etapa mede o cálculo das
+    # métricas derivadas sobre a base inteira, o custo que saiu do painel
+    _, m = medir('metricas', lambda: calcular_metricas(df), repeticoes)
+    medicoes.append(m)
+    valor_exibido, titulo_valor = calcular_valor_exibido(df_filtrado, VOTO_BENCH, MODO_BENCH)
+
+    def binning(metodo):
+        bins, labels = classificar(df_filtrado[valor_exibido].to_numpy(), 5, metodo)
+        return bins, labels, codigos_bins(df_filtrado[valor_exibido].to_numpy(), bins)
+
+    (bins, labels, codigos), m = medir('bins', lambda: binning('iguais'), repeticoes)
+    medicoes.append(m)
+    for metodo in ['quantis', 'jenks']:
+        _, m = medir(f'bins_{metodo}', lambda: binning(metodo), repeticoes)
+        medicoes.append(m)
+
+    cubo, m = medir('cubo', lambda: construir_cubo(df, de_tabela_larga(df).opcoes()), repeticoes)
+    medicoes.append(m)
+
+    # to_dict() força a serialização feita pelo st.altair_chart
+    _, m = medir('criar_graficos', lambda: criar_graficos(
+        cubo, zonas, bairros, VOTO_BENCH, titulo_valor, MODO_BENCH).to_dict(), repeticoes)
+    medicoes.append(m)
+    _, m = medir('criar_grafico_distribuicao', lambda: criar_grafico_distribuicao(
+        df_filtrado.copy(), valor_exibido, bins, labels).to_dict(), repeticoes)
+    medicoes.append(m)
+
+    def camada():
+        raio, cor = estilizar_pontos(codigos, len(labels))
+        df_filtrado['radius'] = raio
+        df_filtrado[['cor_r', 'cor_g', 'cor_b', 'cor_a']] = cor
+        dados_mapa = montar_dados_mapa(df_filtrado, ['radius', 'cor_r', 'cor_g', 'cor_b', 'cor_a'],
+                                       ['zona_eleitoral', 'local_votacao', valor_exibido])
+        # to_json() é o que o st.pydeck_chart envia ao navegador
+        return pdk.Deck(layers=[camada_pontos(dados_mapa)]).to_json()
+
+    _, m = medir('camada_pydeck', camada, repeticoes)
+    medicoes.append(m)
+
+    for medicao in medicoes:
+        medicao.update(escala=escala, locais=len(df))
+    return medicoes
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do painel app.py")
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--saida', default=None, help="arquivo JSON de saída (padrão: só imprime)")
+    args = parser.parse_args()
+
+    # As etapas escrevem colunas no recorte filtrado, como o app.py
+    warnings.simplefilter('ignore', pd.errors.SettingWithCopyWarning)
+
+    pasta = tempfile.mkdtemp(prefix='bench_votos_')
+    try:
+        resultados = []
+        for escala in args.escalas:
+            for medicao in medir_escala(escala, pasta, args.repeticoes):
+                print(f"{medicao['escala']:>5}x {medicao['locais']:>8} locais  {medicao['etapa']:<28}"
+                      f"{medicao['tempo_min_s'] * 1000:>10.1f} ms {medicao['pico_memoria_mb']:>9.1f} MB")
+                resultados.append(medicao)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    relatorio = {
+        'commit': commit_atual(),
+        'python': platform.python_version(),
+        'maquina': platform.platform(),
+        'rss_maximo_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'resultados': resultados,
+    }
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=1)
+    else:
+        print(json.dumps(relatorio, ensure_ascii=False, indent=1))
@@ -0,0 +1,150 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Cache de resultados filtrados/agregados do painel, único no processo e
+# compartilhado entre todas as sessões do Streamlit. A chave é o estado dos
+# filtros normalizado (listas viram tuplas ordenadas), então sessões que
+# escolhem a mesma combinação de voto/modo/zonas/bairros reaproveitam o mesmo
+# objeto, sem cópia dos dados por sessão. Os resultados são somente leitura:
+# arrays numpy são congelados e cada chamada recebe cópias rasas dos
+# DataFrames guardados (mesmos dados, outro objeto), de modo que uma coluna
+# escrita por uma sessão não aparece nas outras.
+#
+# O tamanho total é limitado em memória (PAINEL_CACHE_RESULTADOS_MB, remoção
+# LRU) e cada entrada expira após PAINEL_CACHE_RESULTADOS_TTL segundos (0
+# desliga a expiração), para que novos resultados apareçam sem reiniciar.
+
+LIMITE_MB = float(os.environ.get('PAINEL_CACHE_RESULTADOS_MB', 512))
+TTL_SEGUNDOS = float(os.environ.get('PAINEL_CACHE_RESULTADOS_TTL', 900))
+
+
+def normalizar_chave(*partes):
+    return tuple(
+        tuple(sorted(map(str, parte))) if isinstance(parte, (list, tuple, set, frozenset)) else parte
+        for parte in partes
+    )
+
+
+def tamanho_em_bytes(valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(index=True, deep=True)
+        return int(uso.sum()) if isinstance(valor, pd.DataFrame) else int(uso)
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(v) for v in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(k) + tamanho_em_bytes(v) for k, v in valor.items())
+    return sys.getsizeof(valor)
+
+
+def congelar(valor):
+    if isinstance(valor, np.ndarray):
+        valor.setflags(write=False)
+    elif isinstance(valor, (list, tuple)):
+        for v in valor:
+            congelar(v)
+    elif isinstance(valor, dict):
+        for v in valor.values():
+            congelar(v)
+    return valor
+
+
+# Cópias rasas dos DataFrames/Series de um resultado (os dados não são copiados)
+def vista(valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return valor.copy(deep=False)
+    if isinstance(valor, (list, tuple)):
+        return type(valor)(vista(v) for v in valor)
+    if isinstance(valor, dict):
+        return {k: vista(v) for k, v in valor.items()}
+    return valor
+
+
+class CacheResultados:
+    def __init__(self, limite_mb=LIMITE_MB, ttl=TTL_SEGUNDOS):
+        self.limite_bytes = int(limite_mb * 2**20)
+        self.ttl = ttl
+        self._itens = OrderedDict()   # chave -> (valor, bytes, instante de criação)
+        self._calculando = {}         # chave -> trava do cálculo em andamento
+        self._trava = threading.Lock()
+        self.total_bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+
+    def _buscar(self, chave, agora):
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        if self.ttl > 0 and agora - item[2] > self.ttl:
+            self._remover(chave)
+            return None
+        self._itens.move_to_end(chave)
+        return item
+
+    def _remover(self, chave):
+        _, tamanho, _ = self._itens.pop(chave)
+        self.total_bytes -= tamanho
+
+    def _guardar(self, chave, valor):
+        tamanho = tamanho_em_bytes(valor)
+        if tamanho > self.limite_bytes:
+            return  # Maior que o cache inteiro: devolve sem guardar
+        if chave in self._itens:
+            self._remover(chave)
+        self._itens[chave] = (valor, tamanho, time.monotonic())
+        self.total_bytes += tamanho
+        while self.total_bytes > self.limite_bytes:
+            self._remover(next(iter(self._itens)))
+
+    # Devolve o resultado guardado para a chave ou o calcula uma única vez,
+    # mesmo com várias sessões pedindo a mesma chave ao mesmo tempo (sempre
+    # como vista(), nunca o objeto guardado)
+    def obter(self, chave, calcular):
+        with self._trava:
+            item = self._buscar(chave, time.monotonic())
+            if item is not None:
+                self.acertos += 1
+                return vista(item[0])
+            trava_chave = self._calculando.setdefault(chave, threading.Lock())
+
+        try:
+            with trava_chave:
+                with self._trava:
+                    item = self._buscar(chave, time.monotonic())
+                    if item is not None:
+                        self.acertos += 1
+                        return vista(item[0])
+                valor = congelar(calcular())
+                with self._trava:
+                    self.falhas += 1
+                    self._guardar(chave, valor)
+                return vista(valor)
+        finally:
+            with self._trava:
+                self._calculando.pop(chave, None)
+
+    def invalidar(self, prefixo=None):
+        with self._trava:
+            for chave in [c for c in self._itens if prefixo is None or c[:len(prefixo)] == prefixo]:
+                self._remover(chave)
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                'entradas': len(self._itens),
+                'memoria_mb': self.total_bytes / 2**20,
+                'limite_mb': self.limite_bytes / 2**20,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+            }
+
+
+# Instância do processo, usada por todas as sessões
+resultados = CacheResultados()
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+# Chave canônica de local de votação: um int64 com a zona nos 32 bits altos e
+# o número do local nos 32 bits baixos. Usada no lugar da string 'zon_loc'
+# em junções, filtros e agrupamentos.
+
+DESLOCAMENTO = 32
+MASCARA_LOCAL = (1 << DESLOCAMENTO) - 1
+CHAVE_INVALIDA = -1
+
+
+def chave_local(nr_zona, nr_local_votacao):
+    zona = np.asarray(nr_zona, dtype=np.int64)
+    local = np.asarray(nr_local_votacao, dtype=np.int64)
+    return (zona << DESLOCAMENTO) | local
+
+
+def zona_da_chave(chave):
+    return np.asarray(chave, dtype=np.int64) >> DESLOCAMENTO
+
+
+def local_da_chave(chave):
+    return np.asarray(chave, dtype=np.int64) & MASCARA_LOCAL
+
+
+# Converte a propriedade 'zon_loc' do GeoJSON ("2_2070") na chave inteira.
+# Valores incompletos (ex.: "2_") recebem CHAVE_INVALIDA.
+def chave_de_zon_loc(zon_loc):
+    partes = pd.Series(zon_loc, dtype=object).astype(str).str.partition('_')
+    zona = pd.to_numeric(partes[0], errors='coerce')
+    local = pd.to_numeric(partes[2], errors='coerce')
+    validos = zona.notna() & local.notna()
+    chave = np.full(len(partes), CHAVE_INVALIDA, dtype=np.int64)
+    chave[validos.to_numpy()] = chave_local(zona[validos], local[validos])
+    return chave
@@ -0,0 +1,105 @@
+import numpy as np
+
+from estilo import codigos_bins
+
+# Classificação dos valores exibidos em faixas (bins) para o mapa, as
+# legendas e o gráfico de distribuição: intervalos iguais, quantis ou quebras
+# naturais (Jenks). Todas partem do vetor ordenado uma única vez, então o
+# custo é O(n log n); o Jenks roda sobre uma amostra ordenada de tamanho fixo
+# (quantis do vetor), o que mantém a programação dinâmica O(k m²) constante
+# para qualquer n. Limites repetidos são removidos e um único valor vira um
+# único bin [v, v].
+
+METODOS = {
+    "Intervalos iguais": 'iguais',
+    "Quantis": 'quantis',
+    "Quebras naturais (Jenks)": 'jenks',
+}
+AMOSTRA_JENKS = 512
+
+
+def _ordenar(valores):
+    valores = np.asarray(valores, dtype=np.float64)
+    return np.sort(valores[np.isfinite(valores)])
+
+
+def quebras_iguais(ordenados, num_bins):
+    return np.linspace(ordenados[0], ordenados[-1], num_bins + 1)
+
+
+def quebras_quantis(ordenados, num_bins):
+    posicoes = np.linspace(0, len(ordenados) - 1, num_bins + 1)
+    # Interpolação linear entre vizinhos do vetor já ordenado
+    abaixo = np.floor(posicoes).astype(np.int64)
+    acima = np.minimum(abaixo + 1, len(ordenados) - 1)
+    fracao = posicoes - abaixo
+    return ordenados[abaixo] * (1 - fracao) + ordenados[acima] * fracao
+
+
+# Fisher-Jenks: minimiza a soma dos desvios quadráticos dentro das classes,
+# com somas acumuladas para o custo de cada intervalo em O(1)
+def quebras_jenks(ordenados, num_bins, amostra=AMOSTRA_JENKS):
+    if len(ordenados) > amostra:
+        ordenados = ordenados[np.linspace(0, len(ordenados) - 1, amostra).astype(np.int64)]
+    m = len(ordenados)
+    num_bins = min(num_bins, m)
+    s1 = np.concatenate([[0.0], np.cumsum(ordenados)])
+    s2 = np.concatenate([[0.0], np.cumsum(ordenados ** 2)])
+
+    # desvio[i, j]: soma dos desvios quadráticos de ordenados[i..j]
+    i, j = np.meshgrid(np.arange(m), np.arange(m), indexing='ij')
+    n = j - i + 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        desvio = s2[j + 1] - s2[i] - (s1[j + 1] - s1[i]) ** 2 / n
+    desvio[n <= 0] = np.inf
+
+    custo = desvio[0]              # uma classe: ordenados[0..j]
+    inicios = []
+    for _ in range(1, num_bins):
+        # a última classe começa em i >= 1; as anteriores cobrem 0..i-1
+        total = np.full((m, m), np.inf)
+        total[1:] = custo[:-1, None] + desvio[1:]
+        inicio = np.argmin(total, axis=0)
+        custo = total[inicio, np.arange(m)]
+        inicios.append(inicio)
+
+    # Volta pelos inícios das classes, a partir do último valor
+    fim, limites = m - 1, [ordenados[-1]]
+    for inicio in reversed(inicios):
+        fim = inicio[fim] - 1
+        limites.append(ordenados[fim])
+    limites.append(ordenados[0])
+    return np.array(limites[::-1])
+
+
+def quebras(valores, num_bins=5, metodo='iguais'):
+    ordenados = _ordenar(valores)
+    if len(ordenados) == 0:
+        return np.array([0.0, 0.0])
+    if ordenados[0] == ordenados[-1]:
+        return np.array([ordenados[0], ordenados[-1]])
+    calcular = {'iguais': quebras_iguais, 'quantis': quebras_quantis, 'jenks': quebras_jenks}[metodo]
+    limites = np.unique(calcular(ordenados, num_bins))
+    if len(limites) < 2:
+        return np.array([ordenados[0], ordenados[-1]])
+    return limites
+
+
+def rotulos(bins):
+    if len(bins) == 2 and bins[0] == bins[1]:
+        # Todos os valores são iguais: um único bin com o próprio valor
+        valor = round(float(bins[0]), 2)
+        return [f"{int(valor) if valor.is_integer() else valor}"]
+    return [f"{round(bins[i], 2)} - {round(bins[i + 1], 2)}" for i in range(len(bins) - 1)]
+
+
+# Limites e rótulos das faixas
+def classificar(valores, num_bins=5, metodo='iguais'):
+    bins = quebras(valores, num_bins, metodo)
+    return bins, rotulos(bins)
+
+
+# Número de valores em cada faixa (mesma regra de codigos_bins do mapa)
+def contagem_por_faixa(valores, bins):
+    codigos = codigos_bins(np.asarray(valores, dtype=np.float64), bins)
+    return np.bincount(codigos[codigos >= 0], minlength=len(bins) - 1)
@@ -0,0 +1,149 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from chaves import chave_local
+from esquema import TIPO_CONTAGEM, aplicar_esquema, colunas_votos
+from ingestao import BRANCOS_NULOS, NOMES_TOTAIS
+from metricas import percentual
+from votos_longos import ordem_votavel
+
+# Comparação entre eleições (ou turnos) por local de votação. As tabelas
+# largas de cada eleição (no formato de votos_cwb_pref1T_locvot.csv, geradas
+# por votos.py, incremental.py ou lote.py) são alinhadas uma única vez pela
+# chave inteira do local: cada eleição vira uma matriz locais x votáveis na
+# mesma ordem de locais, com uma máscara de presença. Variações (swing) e
+# saldos entre quaisquer pares de votáveis são diferenças entre vetores
+# alinhados, sem novas junções de DataFrames.
+#
+# Eleições oferecidas no painel: PAINEL_ELEICOES="rótulo=arquivo;..." ou,
+# por padrão, os dois turnos de 2024 (só as que têm arquivo).
+
+ELEICOES_PADRAO = {
+    "1º turno 2024": 'votos_cwb_pref1T_locvot.csv',
+    "2º turno 2024": 'votos_cwb_pref2T_locvot.csv',
+}
+
+
+def eleicoes_configuradas():
+    configuracao = os.environ.get('PAINEL_ELEICOES')
+    if configuracao:
+        eleicoes = dict(item.split('=', 1) for item in configuracao.split(';') if '=' in item)
+    else:
+        eleicoes = ELEICOES_PADRAO
+    return {rotulo: caminho for rotulo, caminho in eleicoes.items() if os.path.exists(caminho)}
+
+
+def ler_eleicao(caminho):
+    return aplicar_esquema(pd.read_csv(caminho, dtype={'zon_loc': str}))
+
+
+class Comparacao:
+    def __init__(self, tabelas):
+        self.eleicoes = list(tabelas)
+        chaves = [chave_local(df['nr_zona'], df['nr_local_votacao']) for df in tabelas.values()]
+        self.locais = np.unique(np.concatenate(chaves))
+        self.presente = np.zeros((len(self.eleicoes), len(self.locais)), dtype=bool)
+        self.colunas = {}
+        self.matrizes = {}
+        for i, ((rotulo, df), chave) in enumerate(zip(tabelas.items(), chaves)):
+            posicao = np.searchsorted(self.locais, chave)
+            colunas = colunas_votos(df)
+            matriz = np.zeros((len(self.locais), len(colunas)), dtype=TIPO_CONTAGEM)
+            matriz[posicao] = df[colunas].to_numpy()
+            self.presente[i, posicao] = True
+            self.colunas[rotulo] = {col: j for j, col in enumerate(colunas)}
+            self.matrizes[rotulo] = matriz
+
+    def opcoes(self, eleicao):
+        return sorted(self.colunas[eleicao], key=ordem_votavel)
+
+    def candidatos(self, eleicao):
+        return [nome for nome in self.opcoes(eleicao)
+                if nome not in NOMES_TOTAIS.values() and nome not in BRANCOS_NULOS]
+
+    # Votos de um votável em todos os locais alinhados (0 onde não concorreu)
+    def votos(self, eleicao, nome):
+        j = self.colunas[eleicao].get(nome)
+        if j is None:
+            return np.zeros(len(self.locais), dtype=np.int64)
+        return self.matrizes[eleicao][:, j].astype(np.int64)
+
+    def comuns(self, a, b):
+        return self.presente[self.eleicoes.index(a)] & self.presente[self.eleicoes.index(b)]
+
+    # Valor de um votável: votos ou % da base (VOTOS APTOS, VOTOS NOMINAIS...)
+    def valor(self, eleicao, nome, base=None):
+        votos = self.votos(eleicao, nome)
+        return votos if base is None else percentual(votos, self.votos(eleicao, base))
+
+    # Variação de 'nome_a' na eleição a para 'nome_b' na eleição b, nos
+    # locais presentes nas duas (em votos ou em pontos percentuais da base)
+    def variacao(self, a, nome_a, b, nome_b, base=None):
+        comuns = self.comuns(a, b)
+        valor_a = self.valor(a, nome_a, base)[comuns]
+        valor_b = self.valor(b, nome_b, base)[comuns]
+        return pd.DataFrame({
+            'id_local': self.locais[comuns],
+            'valor_a': valor_a,
+            'valor_b': valor_b,
+            'variacao': np.round(valor_b - valor_a, 1) if base is not None else valor_b - valor_a,
+        })
+
+    # Saldo de cada votável entre as eleições a e b, por local (b - a), e
+    # estimativa líquida das transferências: os votos liberados pelos
+    # candidatos de a que não estão em b e a parte deles que corresponde ao
+    # ganho de cada votável de b. É um saldo agregado por local, não um
+    # rastreamento de eleitores.
+    def transferencias(self, a, b):
+        comuns = self.comuns(a, b)
+        nomes = sorted(set(self.colunas[a]) | set(self.colunas[b]), key=ordem_votavel)
+        matriz_a = np.column_stack([self.votos(a, nome)[comuns] for nome in nomes])
+        matriz_b = np.column_stack([self.votos(b, nome)[comuns] for nome in nomes])
+        saldo = matriz_b - matriz_a
+
+        candidatos_a = set(self.candidatos(a))
+        eliminados = [j for j, nome in enumerate(nomes) if nome in candidatos_a and nome not in self.colunas[b]]
+        liberados = matriz_a[:, eliminados].sum(axis=1)
+        ganho = np.clip(saldo, 0, None)
+
+        return pd.DataFrame({
+            'id_local': np.repeat(self.locais[comuns], len(nomes)),
+            'nome': np.tile(nomes, comuns.sum()),
+            'votos_a': matriz_a.ravel(),
+            'votos_b': matriz_b.ravel(),
+            'saldo': saldo.ravel(),
+            'liberados': np.repeat(liberados, len(nomes)),
+            'absorcao (%)': percentual(ganho, liberados[:, None]).ravel(),
+        })
+
+
+# Soma de colunas de uma tabela por local (com 'id_local') por região:
+# 'regioes' é uma Series id_local -> região (bairro, zona...)
+def por_regiao(tabela, regioes, colunas, chaves=()):
+    regiao = regioes.reindex(tabela['id_local'].to_numpy())
+    dentro = regiao.notna().to_numpy()
+    tabela = tabela[dentro].assign(regiao=regiao.to_numpy()[dentro])
+    return tabela.groupby(['regiao'] + list(chaves), observed=True, sort=True)[colunas].sum().reset_index()
+
+
+def construir_comparacao(eleicoes):
+    return Comparacao({rotulo: ler_eleicao(caminho) for rotulo, caminho in eleicoes.items()})
+
+
+# Uso (saldos por local entre dois arquivos consolidados):
+#   python comparacao.py votos_cwb_pref1T_locvot.csv votos_cwb_pref2T_locvot.csv [--saida saldos.csv]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Saldos de votos por local entre duas eleições (ou turnos)")
+    parser.add_argument('eleicao_a')
+    parser.add_argument('eleicao_b')
+    parser.add_argument('--saida', default=None)
+    args = parser.parse_args()
+
+    comparacao = construir_comparacao({'a': args.eleicao_a, 'b': args.eleicao_b})
+    saldos = comparacao.transferencias('a', 'b')
+    print(saldos.groupby('nome', sort=False)[['votos_a', 'votos_b', 'saldo']].sum().to_string())
+    if args.saida:
+        saldos.to_csv(args.saida, index=False, encoding='utf-8')
@@ -0,0 +1,125 @@
+import os
+import threading
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from bairros import CRS_MAPA, DIVISA_BAIRROS
+from dados import PASTA_CACHE, cache_atualizado
+from classificacao import quebras
+from estilo import codigos_bins, estilizar_pontos
+
+# Geometria dos bairros simplificada em alguns níveis de zoom para o mapa
+# coroplético. Cada nível é gerado uma única vez (simplificação em metros, no
+# CRS original da divisa) e guardado em GeoParquet com precisão de 1e-5 grau.
+# A simplificação é feita sobre a topologia compartilhada: cada trecho de
+# divisa entre dois bairros é um único arco, simplificado uma vez, e os
+# polígonos são refeitos a partir dos arcos; vizinhos usam o mesmo arco, sem
+# frestas nem sobreposições ao longo da divisa.
+
+# Nível de zoom -> tolerância de simplificação em metros
+NIVEIS_ZOOM = {10: 80.0, 12: 25.0, 14: 5.0}
+PRECISAO = 1e-5
+# Incrementar quando a geração dos níveis mudar
+VERSAO_NIVEIS = 2
+
+# Uma única geração dos níveis por vez no processo (sessões e threads do
+# servidor de tiles podem pedir o mesmo nível ao mesmo tempo)
+_trava_niveis = threading.Lock()
+
+
+def caminho_nivel(zoom, pasta=PASTA_CACHE):
+    return os.path.join(pasta, f'bairros_z{zoom}_v{VERSAO_NIVEIS}.parquet')
+
+
+def nivel_para_zoom(zoom):
+    # Maior nível pré-calculado que não ultrapassa o zoom pedido
+    niveis = sorted(NIVEIS_ZOOM)
+    return max([nivel for nivel in niveis if nivel <= zoom], default=niveis[0])
+
+
+# Arcos da divisa: as fronteiras de todos os bairros unidas (trechos comuns
+# aparecem uma só vez) e emendadas entre os nós onde três ou mais se encontram
+def arcos_divisa(geometrias):
+    return shapely.get_parts(shapely.line_merge(shapely.union_all(shapely.boundary(geometrias))))
+
+
+# Simplifica os arcos (as pontas, nós da topologia, ficam fixas) e refaz os
+# polígonos. Cada face volta ao bairro que contém um ponto interior dela;
+# bairros sem face (colapsados pela tolerância) ficam com a simplificação
+# isolada do próprio polígono.
+def simplificar_topologia(geometrias, arcos, tolerancia):
+    simplificados = shapely.simplify(arcos, tolerancia, preserve_topology=True)
+    # A união refaz os nós caso dois arcos simplificados se cruzem
+    faces = shapely.get_parts(shapely.polygonize(shapely.get_parts(shapely.union_all(simplificados))))
+    face, dono = shapely.STRtree(geometrias).query(shapely.point_on_surface(faces), predicate='within')
+    resultado = shapely.simplify(geometrias, tolerancia, preserve_topology=True)
+    for i in np.unique(dono):
+        resultado[i] = shapely.union_all(faces[face[dono == i]])
+    return resultado
+
+
+def construir_niveis(caminho=DIVISA_BAIRROS, pasta=PASTA_CACHE):
+    bairros = gpd.read_file(caminho)[['OBJECTID', 'NOME', 'geometry']]
+    bairros = bairros.rename(columns={'OBJECTID': 'id_bairro'})
+    geometrias = bairros.geometry.values.to_numpy()
+    arcos = arcos_divisa(geometrias)
+    os.makedirs(pasta, exist_ok=True)
+    for zoom, tolerancia in NIVEIS_ZOOM.items():
+        nivel = bairros.copy()
+        nivel['geometry'] = gpd.GeoSeries(simplificar_topologia(geometrias, arcos, tolerancia),
+                                          index=bairros.index, crs=bairros.crs)
+        nivel = nivel.to_crs(CRS_MAPA)
+        nivel['geometry'] = shapely.set_precision(nivel.geometry.values, PRECISAO)
+        destino = caminho_nivel(zoom, pasta)
+        nivel.to_parquet(destino + '.tmp', index=False)
+        os.replace(destino + '.tmp', destino)
+
+
+def ler_nivel(zoom, caminho=DIVISA_BAIRROS, pasta=PASTA_CACHE):
+    destino = caminho_nivel(zoom, pasta)
+    with _trava_niveis:
+        if not cache_atualizado(destino, caminho):
+            construir_niveis(caminho, pasta)
+    return gpd.read_parquet(destino)
+
+
+# Contornos no formato do PolygonLayer do pydeck: uma linha por polígono
+# (multipolígonos são separados), com anel externo e buracos
+def contornos(nivel):
+    partes = nivel.explode(index_parts=False).reset_index(drop=True)
+    aneis = [
+        [np.asarray(poligono.exterior.coords)[:, :2].tolist()]
+        + [np.asarray(buraco.coords)[:, :2].tolist() for buraco in poligono.interiors]
+        for poligono in partes.geometry.values
+    ]
+    return pd.DataFrame({
+        'id_bairro': partes['id_bairro'].to_numpy(),
+        'NOME': partes['NOME'].to_numpy(),
+        'contorno': aneis,
+    })
+
+
+# Soma do tipo de voto selecionado por polígono de bairro
+def valores_por_bairro(df, voto, proporcao=False):
+    colunas = list(dict.fromkeys([voto, 'VOTOS APTOS']))
+    agregado = df.groupby('id_bairro')[colunas].sum()
+    if proporcao:
+        aptos = agregado['VOTOS APTOS'].to_numpy(dtype=np.float64)
+        valores = np.divide(agregado[voto].to_numpy(dtype=np.float64) * 100, aptos,
+                            out=np.zeros(len(aptos)), where=aptos > 0)
+        return pd.Series(np.round(valores, 1), index=agregado.index)
+    return agregado[voto]
+
+
+# Tabela do PolygonLayer: contorno, nome, valor e cor RGBA por bairro
+def dados_coropleticos(tabela_contornos, valores, num_bins=5, metodo='iguais'):
+    valor = valores.reindex(tabela_contornos['id_bairro']).fillna(0).to_numpy(dtype=np.float64)
+    bins = quebras(valor, num_bins, metodo)
+    _, cor = estilizar_pontos(codigos_bins(valor, bins), len(bins) - 1)
+    dados = tabela_contornos.copy()
+    dados['valor'] = np.round(valor, 2)
+    dados[['cor_r', 'cor_g', 'cor_b', 'cor_a']] = cor
+    return dados
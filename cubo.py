@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+# Cubo pré-agregado por (zona eleitoral, bairro) com a soma de cada tipo de
+# voto. Indicadores e gráficos por bairro de qualquer seleção da barra
+# lateral saem da soma de algumas células, sem varrer a base de locais.
+
+
+class CuboVotos:
+    def __init__(self, zonas, bairros, colunas, valores):
+        self.zonas = zonas        # zona de cada célula
+        self.bairros = bairros    # bairro de cada célula
+        self.colunas = colunas
+        self.valores = valores    # matriz células x colunas
+        self.posicao = {col: i for i, col in enumerate(colunas)}
+
+    def celulas(self, zonas_sel, bairros_sel):
+        return np.isin(self.zonas, list(zonas_sel)) & np.isin(self.bairros, list(bairros_sel))
+
+    def totais(self, zonas_sel, bairros_sel, colunas):
+        colunas = list(dict.fromkeys(colunas))
+        mascara = self.celulas(zonas_sel, bairros_sel)
+        idx = [self.posicao[col] for col in colunas]
+        return pd.Series(self.valores[mascara][:, idx].sum(axis=0), index=colunas)
+
+    def por_bairro(self, zonas_sel, bairros_sel, colunas):
+        colunas = list(dict.fromkeys(colunas))
+        mascara = self.celulas(zonas_sel, bairros_sel)
+        idx = [self.posicao[col] for col in colunas]
+        df = pd.DataFrame(self.valores[mascara][:, idx], columns=colunas)
+        df['BAIRRO'] = self.bairros[mascara]
+        return df.groupby('BAIRRO', sort=True)[colunas].sum().reset_index()
+
+
+def construir_cubo(df, colunas, zona='zona_eleitoral', bairro='BAIRRO'):
+    agregado = df.groupby([zona, bairro], observed=True, sort=True)[colunas].sum()
+    return CuboVotos(
+        zonas=agregado.index.get_level_values(zona).to_numpy(),
+        bairros=agregado.index.get_level_values(bairro).to_numpy(),
+        colunas=list(colunas),
+        valores=agregado.to_numpy(),
+    )
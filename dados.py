@@ -0,0 +1,105 @@
+import os
+
+import geopandas as gpd
+import pandas as pd
+import pyarrow.parquet as pq
+
+from bairros import DIVISA_BAIRROS, atribuir_bairros, ler_bairros
+from chaves import chave_de_zon_loc, chave_local, local_da_chave, zona_da_chave
+from esquema import aplicar_esquema, colunas_contagem
+from metricas import adicionar_metricas
+
+# Cache colunar (GeoParquet) da base unida votos + locais de votação.
+# O arquivo é gerado uma única vez e reaproveitado enquanto for mais novo
+# que o CSV de votos, o GeoJSON e a divisa de bairros; os pontos também ficam
+# em colunas lon/lat. As colunas seguem o esquema compacto de esquema.py.
+
+# VERSAO_CACHE deve ser incrementada quando as colunas do cache mudarem
+VERSAO_CACHE = 6
+PASTA_CACHE = 'cache'
+CACHE_LOCAIS = os.path.join(PASTA_CACHE, f'locais_votos_v{VERSAO_CACHE}.parquet')
+
+
+def unir_votos_locais(votes_path, geojson_path, bairros_path=DIVISA_BAIRROS):
+    # Carregar dados de votação
+    df_votes = pd.read_csv(votes_path)
+    df_votes['id_local'] = chave_local(df_votes['nr_zona'], df_votes['nr_local_votacao'])
+
+    # Zona e local vêm da chave inteira, sem separar strings
+    df_votes['zona_eleitoral'] = zona_da_chave(df_votes['id_local'])
+    df_votes['local_votacao'] = local_da_chave(df_votes['id_local'])
+    df_votes = df_votes.drop(columns='zon_loc')
+    contagens = colunas_contagem(df_votes)
+
+    # Carregar dados geográficos
+    gdf = gpd.read_file(geojson_path)
+    gdf['id_local'] = chave_de_zon_loc(gdf['zon_loc'])
+    gdf = gdf.drop(columns='zon_loc')
+
+    # Unir dados de votação com geográficos pela chave inteira
+    df_merged = df_votes.merge(gdf, on='id_local')
+
+    # Garantir que estamos lidando com um GeoDataFrame
+    if not isinstance(df_merged, gpd.GeoDataFrame):
+        df_merged = gpd.GeoDataFrame(df_merged, geometry='geometry')
+
+    # Definir CRS para WGS 84 (EPSG:4326)
+    df_merged = df_merged.set_crs("EPSG:4326", allow_override=True)
+
+    df_merged['lon'] = df_merged.geometry.x
+    df_merged['lat'] = df_merged.geometry.y
+
+    # Bairro pela divisa oficial (junção espacial feita só na geração do cache)
+    bairros = ler_bairros(bairros_path)
+    posicao = atribuir_bairros(df_merged['lon'], df_merged['lat'], bairros)
+    df_merged['id_bairro'] = bairros['OBJECTID'].to_numpy()[posicao]
+    df_merged['BAIRRO_DIVISA'] = bairros['NOME'].to_numpy()[posicao]
+
+    # Esquema compacto (contagens uint32, zona/bairro categóricos, lon/lat
+    # float32); o GeoParquet guarda os tipos e ler_cache os devolve iguais.
+    # As métricas derivadas (comparecimento, proporções, vencedor e margem)
+    # são calculadas aqui, uma vez por versão do cache
+    return adicionar_metricas(aplicar_esquema(df_merged, contagens))
+
+
+def cache_atualizado(destino, *fontes):
+    if not os.path.exists(destino):
+        return False
+    mtime = os.path.getmtime(destino)
+    return all(os.path.getmtime(fonte) < mtime for fonte in fontes)
+
+
+def construir_cache(votes_path, geojson_path, destino=CACHE_LOCAIS, bairros_path=DIVISA_BAIRROS):
+    df_merged = unir_votos_locais(votes_path, geojson_path, bairros_path)
+    os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+    # Escrever em arquivo temporário e trocar de uma vez, para nunca
+    # expor um cache pela metade
+    temporario = destino + '.tmp'
+    df_merged.to_parquet(temporario, index=False)
+    os.replace(temporario, destino)
+    return df_merged
+
+
+def ler_cache(destino=CACHE_LOCAIS):
+    # Ler só as colunas de dados, sem decodificar a geometria WKB: os pontos
+    # são reconstruídos a partir das colunas lon/lat (to_pandas() copia os
+    # dados para o DataFrame, então o arquivo é lido normalmente)
+    colunas = [c for c in pq.read_schema(destino).names if c != 'geometry']
+    df = pq.read_table(destino, columns=colunas).to_pandas()
+    # Categorias de inteiros (zona) não voltam do Parquet como categóricas
+    aplicar_esquema(df, contagens=[])
+    return gpd.GeoDataFrame(
+        df, geometry=gpd.points_from_xy(df['lon'], df['lat']), crs="EPSG:4326"
+    )
+
+
+def carregar_dados(votes_path, geojson_path, destino=CACHE_LOCAIS, bairros_path=DIVISA_BAIRROS):
+    if cache_atualizado(destino, votes_path, geojson_path, bairros_path):
+        return ler_cache(destino)
+    return construir_cache(votes_path, geojson_path, destino, bairros_path)
+
+
+# Permite gerar o cache antes de subir os painéis:
+#   python dados.py
+if __name__ == '__main__':
+    construir_cache('votos_cwb_pref1T_locvot.csv', 'locais_votacao.geojson')
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# Esquema compacto das tabelas de votos por local de votação, aplicado em
+# toda a cadeia (montar_pivot, CSV incremental, cache GeoParquet, painéis):
+# contagens em uint32, proporções derivadas em float32, chaves numéricas no menor inteiro sem sinal que
+# comporta o código, campos de zona/bairro categóricos, textos em strings do
+# Arrow e coordenadas em float32 (~1 m de precisão, suficiente para o mapa).
+
+TIPO_CONTAGEM = 'uint32'
+
+# Proporções derivadas por local (metricas.py), em % com uma casa decimal:
+# float32 basta e ocupa o mesmo que uma contagem
+TIPO_PROPORCAO = 'float32'
+SUFIXO_APTOS = ' (%)'
+SUFIXO_VALIDOS = ' (% VÁLIDOS)'
+
+TIPOS_CHAVES = {
+    'nr_zona': 'uint16',
+    'nr_local_votacao': 'uint32',
+    'local_votacao': 'uint32',
+    'id_bairro': 'uint16',
+    'lon': 'float32',
+    'lat': 'float32',
+}
+
+CATEGORICAS = [
+    'zona_eleitoral', 'BAIRRO', 'BAIRRO_DIVISA', 'REGIONAL',
+    'COD_ZONA', 'ZONA_ELEIT', 'FONTE', 'DATA_ALTER', 'VENCEDOR', 'SEGUNDO',
+]
+
+# Textos únicos por local (nome, endereço, códigos): strings do Arrow, sem
+# um objeto Python por valor
+TEXTOS = ['CODIGO', 'COD_TRE', 'NOME_LOCAL', 'ENDERECO', 'NOME_MAPA']
+TIPO_TEXTO = 'string[pyarrow]'
+
+# Contagens derivadas por local (metricas.py), que não são tipos de voto
+DERIVADAS = ['COMPARECIMENTO', 'MARGEM']
+
+# Colunas inteiras que não são contagens de votos
+NAO_CONTAGENS = set(TIPOS_CHAVES) | set(CATEGORICAS) | set(DERIVADAS) | {'id_local', 'OBJECTID'}
+
+
+def colunas_proporcao(df):
+    return [col for col in df.columns if col.endswith(SUFIXO_APTOS) or col.endswith(SUFIXO_VALIDOS)]
+
+
+def colunas_contagem(df):
+    proporcoes = set(colunas_proporcao(df))
+    return [
+        col for col in df.columns
+        if col not in NAO_CONTAGENS and col not in proporcoes and pd.api.types.is_numeric_dtype(df[col])
+        and not pd.api.types.is_bool_dtype(df[col])
+    ]
+
+
+# Colunas de votos de uma tabela já no esquema compacto
+def colunas_votos(df):
+    return [col for col in df.columns if col not in NAO_CONTAGENS and df[col].dtype == TIPO_CONTAGEM]
+
+
+def para_contagem(serie):
+    valores = serie.fillna(0).to_numpy()
+    if len(valores) and (valores.min() < 0 or valores.max() > np.iinfo(TIPO_CONTAGEM).max):
+        raise ValueError(f"coluna {serie.name!r} fora do intervalo de {TIPO_CONTAGEM}")
+    return valores.astype(TIPO_CONTAGEM)
+
+
+# Converte, no próprio DataFrame, as colunas presentes para o esquema
+# compacto; 'contagens' lista as colunas de votos (padrão: todas as demais
+# colunas numéricas)
+def aplicar_esquema(df, contagens=None):
+    contagens = colunas_contagem(df) if contagens is None else contagens
+    for col in contagens:
+        df[col] = para_contagem(df[col])
+    for col in colunas_proporcao(df):
+        df[col] = df[col].astype(TIPO_PROPORCAO)
+    for col, tipo in TIPOS_CHAVES.items():
+        if col in df.columns:
+            df[col] = df[col].astype(tipo)
+    for col in CATEGORICAS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col in TEXTOS:
+        if col in df.columns:
+            df[col] = df[col].astype(TIPO_TEXTO)
+    return df
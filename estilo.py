@@ -0,0 +1,65 @@
+import colorsys
+import zlib
+
+import numpy as np
+
+# Estilo dos pontos do mapa (raio e cor RGBA) a partir do código do bin de
+# cada ponto. Os vetores de saída são pré-alocados e preenchidos com
+# np.take, sem converter bins em texto nem mapear dicionários linha a linha.
+
+PALETA_CORES = [
+    (0, 128, 255, 220),      # Azul claro
+    (0, 100, 200, 220),
+    (0, 80, 180, 220),
+    (0, 60, 160, 220),
+    (0, 40, 140, 220)        # Azul escuro
+]
+COR_UNICA = (0, 128, 255, 220)   # Azul intermediário, quando há um único bin
+COR_PADRAO = (0, 128, 255, 220)  # Pontos fora de qualquer bin
+
+RAIO_MIN, RAIO_MAX = 150, 1100
+RAIO_UNICO = 650
+
+
+# Mesmo resultado de pd.cut(..., include_lowest=True): o bin i é o intervalo
+# (bins[i], bins[i+1]], com o primeiro fechado à esquerda. Fora dos bins: -1.
+def codigos_bins(valores, bins):
+    valores = np.asarray(valores, dtype=np.float64)
+    bins = np.asarray(bins, dtype=np.float64)
+    codigos = np.searchsorted(bins, valores, side='left') - 1
+    codigos[valores == bins[0]] = 0
+    codigos[(codigos < 0) | (codigos >= len(bins) - 1) | np.isnan(valores)] = -1
+    return codigos
+
+
+def raios_bins(num_bins):
+    if num_bins > 1:
+        return np.linspace(RAIO_MIN, RAIO_MAX, num_bins)
+    return np.array([RAIO_UNICO], dtype=np.float64)
+
+
+# Cor fixa por nome de votável (candidato, branco, nulo...), para painéis
+# que colorem por tipo de voto sem uma tabela de cores por eleição
+def cor_votavel(nome):
+    matiz = (zlib.crc32(nome.encode('utf-8')) % 360) / 360.0
+    r, g, b = colorsys.hsv_to_rgb(matiz, 0.75, 0.85)
+    return [int(r * 255), int(g * 255), int(b * 255)]
+
+
+def cores_bins(num_bins):
+    if num_bins > 1:
+        return PALETA_CORES[:num_bins]
+    return [COR_UNICA]
+
+
+# Tabelas de consulta com uma posição extra no final: o código -1 (fora dos
+# bins) indexa essa posição, que guarda o valor padrão
+def estilizar_pontos(codigos, num_bins):
+    tabela_raio = np.append(raios_bins(num_bins), RAIO_MIN).astype(np.float32)
+    tabela_cor = np.array(cores_bins(num_bins) + [COR_PADRAO], dtype=np.uint8)
+
+    raio = np.empty(len(codigos), dtype=np.float32)
+    cor = np.empty((len(codigos), 4), dtype=np.uint8)
+    np.take(tabela_raio, codigos, out=raio)
+    np.take(tabela_cor, codigos, axis=0, out=cor)
+    return raio, cor
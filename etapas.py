@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from classificacao import classificar
+from comparacao import por_regiao
+from estilo import codigos_bins, cor_votavel, estilizar_pontos
+from mapa import montar_dados_mapa
+from esquema import SUFIXO_APTOS, SUFIXO_VALIDOS
+from metricas import percentual
+
+# Etapas de preparação de dados do painel (app.py), separadas do script do
+# Streamlit para poderem ser medidas e reutilizadas fora dele
+
+COR_SEM_VENCEDOR = [160, 160, 160, 160]
+CORES_VARIACAO = {
+    "Perda": [215, 48, 39, 200],
+    "Sem variação": [160, 160, 160, 160],
+    "Ganho": [26, 150, 65, 200],
+}
+
+
+# 5. Aplicação dos Filtros nos Dados
+# O recorte já é uma tabela nova (a seleção por máscara copia as linhas); a
+# cópia rasa só a desvincula de df, para que as etapas seguintes escrevam
+# colunas nela sem SettingWithCopyWarning e sem tocar a base compartilhada
+def filtrar_locais(df, zona_selecionada, bairro_selecionado):
+    mascara = df['zona_eleitoral'].isin(zona_selecionada).to_numpy() & df['BAIRRO'].isin(bairro_selecionado).to_numpy()
+    return df[mascara].copy(deep=False)
+
+
+# 6. Aplicar lógica para proporção ou absoluto
+def calcular_valor_exibido(df_filtrado, voto_selecionado, modo_visualizacao):
+    if modo_visualizacao == "Proporção (%)":
+        valor_exibido = voto_selecionado + SUFIXO_APTOS
+        titulo_valor = "Proporção em Relação aos Votos Aptos"
+        # A proporção já vem calculada na base (metricas.py); só é calculada
+        # aqui para tabelas sem as métricas derivadas
+        if valor_exibido not in df_filtrado.columns:
+            df_filtrado[valor_exibido] = percentual(df_filtrado[voto_selecionado], df_filtrado['VOTOS APTOS'])
+    else:
+        valor_exibido = voto_selecionado
+        df_filtrado[valor_exibido] = df_filtrado[voto_selecionado].fillna(0)
+        titulo_valor = "Quantidade de " + voto_selecionado
+    return valor_exibido, titulo_valor
+
+
+# 5-7 de uma vez: recorte filtrado com o valor exibido e o estilo (raio e cor)
+# de cada ponto, no formato guardado pelo cache de resultados compartilhado
+def preparar_locais(df, voto_selecionado, modo_visualizacao, zona_selecionada, bairro_selecionado, num_bins=5,
+                    metodo='iguais'):
+    df_filtrado = filtrar_locais(df, zona_selecionada, bairro_selecionado)
+    valor_exibido, titulo_valor = calcular_valor_exibido(df_filtrado, voto_selecionado, modo_visualizacao)
+    # 7. Intervalos (bins) para valor_exibido, pelo método de classificação
+    bins, labels = classificar(df_filtrado[valor_exibido].to_numpy(), num_bins, metodo)
+
+    # Código do bin de cada ponto (-1 para valores fora dos bins)
+    codigos = codigos_bins(df_filtrado[valor_exibido].to_numpy(), bins)
+    raio, cor = estilizar_pontos(codigos, len(labels))
+    df_filtrado['radius'] = raio
+    df_filtrado[['cor_r', 'cor_g', 'cor_b', 'cor_a']] = cor
+    return df_filtrado, valor_exibido, titulo_valor, bins, labels
+
+
+# Mapa de vencedores: cor pelo candidato mais votado em cada local e raio
+# pela margem sobre o segundo colocado (% dos válidos), lidos das métricas
+# derivadas da base. Locais sem votos nominais ficam em cinza.
+def preparar_vencedores(df_filtrado, num_bins=5, metodo='iguais'):
+    margem = df_filtrado['MARGEM' + SUFIXO_VALIDOS].to_numpy()
+    bins, labels = classificar(margem, num_bins, metodo)
+    raio, _ = estilizar_pontos(codigos_bins(margem, bins), len(labels))
+
+    vencedor = df_filtrado['VENCEDOR'].cat.remove_unused_categories()
+    cores = {nome: cor_votavel(nome) for nome in vencedor.cat.categories}
+    # Código -1 (sem vencedor) cai na última linha da tabela
+    tabela_cores = np.array([cor + [200] for cor in cores.values()] + [COR_SEM_VENCEDOR])
+
+    dados = montar_dados_mapa(df_filtrado, [], ['zona_eleitoral', 'local_votacao', 'MARGEM', 'MARGEM' + SUFIXO_VALIDOS])
+    dados['VENCEDOR'] = vencedor.astype(str).where(vencedor.notna(), '-').to_numpy()
+    dados['SEGUNDO'] = df_filtrado['SEGUNDO'].astype(str).where(df_filtrado['SEGUNDO'].notna(), '-').to_numpy()
+    dados['radius'] = raio
+    dados[['cor_r', 'cor_g', 'cor_b', 'cor_a']] = tabela_cores[vencedor.cat.codes.to_numpy()]
+    return dados, cores, labels
+
+
+# Modo de comparação: variação do votável a (eleição a) para o votável b
+# (eleição b) nos locais filtrados presentes nas duas, em votos ou em pontos
+# percentuais dos votos aptos. Cor pelo sinal, raio pela magnitude; a tabela
+# por bairro soma votos (e bases) antes de calcular a proporção.
+def preparar_comparacao(comparacao, df_filtrado, a, nome_a, b, nome_b, proporcao, num_bins=5, metodo='iguais'):
+    base = 'VOTOS APTOS' if proporcao else None
+    variacao = comparacao.variacao(a, nome_a, b, nome_b, base)
+    posicao = pd.Index(df_filtrado['id_local']).get_indexer(variacao['id_local'])
+    variacao = variacao[posicao >= 0].reset_index(drop=True)
+    linhas = df_filtrado.iloc[posicao[posicao >= 0]]
+
+    magnitude = np.abs(variacao['variacao'].to_numpy(dtype=np.float64))
+    bins, labels = classificar(magnitude, num_bins, metodo)
+    raio, _ = estilizar_pontos(codigos_bins(magnitude, bins), len(labels))
+    sinal = np.sign(variacao['variacao'].to_numpy()).astype(np.int64)
+
+    dados = montar_dados_mapa(linhas, [], ['zona_eleitoral', 'local_votacao', 'BAIRRO'])
+    dados[['valor_a', 'valor_b', 'variacao']] = variacao[['valor_a', 'valor_b', 'variacao']].to_numpy()
+    dados['radius'] = raio
+    # sinal -1, 0, 1 -> perda, sem variação, ganho
+    dados[['cor_r', 'cor_g', 'cor_b', 'cor_a']] = np.array(list(CORES_VARIACAO.values()))[sinal + 1]
+
+    regioes = pd.Series(linhas['BAIRRO'].to_numpy(), index=variacao['id_local'].to_numpy())
+    somas = pd.DataFrame({
+        'id_local': comparacao.locais,
+        'votos_a': comparacao.votos(a, nome_a),
+        'votos_b': comparacao.votos(b, nome_b),
+        'base_a': comparacao.votos(a, 'VOTOS APTOS'),
+        'base_b': comparacao.votos(b, 'VOTOS APTOS'),
+    })
+    bairros = por_regiao(somas, regioes, ['votos_a', 'votos_b', 'base_a', 'base_b']).rename(columns={'regiao': 'BAIRRO'})
+    if proporcao:
+        bairros['valor_a'] = percentual(bairros['votos_a'], bairros['base_a'])
+        bairros['valor_b'] = percentual(bairros['votos_b'], bairros['base_b'])
+    else:
+        bairros['valor_a'], bairros['valor_b'] = bairros['votos_a'], bairros['votos_b']
+    bairros['variacao'] = np.round(bairros['valor_b'] - bairros['valor_a'], 1)
+    bairros = bairros[['BAIRRO', 'valor_a', 'valor_b', 'variacao']].sort_values('variacao', ascending=False)
+    return dados, bairros.reset_index(drop=True), labels
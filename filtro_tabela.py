@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+# Filtro da DataTable do Dash feito no servidor (votos.py): a consulta
+# filter_query ('{coluna} operador valor', partes unidas por ' && ') vira uma
+# máscara booleana vetorizada sobre o DataFrame, sem copiar linhas.
+
+# Operadores aceitos na consulta de filtro da DataTable
+OPERADORES = [
+    ['ge ', '>='],
+    ['le ', '<='],
+    ['lt ', '<'],
+    ['gt ', '>'],
+    ['ne ', '!='],
+    ['eq ', '='],
+    ['contains '],
+    ['datestartswith '],
+]
+
+
+def separar_filtro(parte):
+    # O operador vem logo depois de '{coluna}': procurá-lo só aí evita
+    # confundi-lo com o mesmo texto dentro do valor ('{nome} eq "le monde"')
+    inicio, fim = parte.find('{'), parte.find('}')
+    if inicio < 0 or fim < inicio:
+        return [None] * 3
+    nome = parte[inicio + 1: fim]
+    resto = parte[fim + 1:].lstrip()
+    for grupo in OPERADORES:
+        for operador in grupo:
+            if resto.startswith(operador):
+                valor_parte = resto[len(operador):].strip()
+                v0 = valor_parte[0] if valor_parte else ''
+                # O valor fica como texto; a conversão para número depende
+                # da coluna e do operador (ver mascara_filtro)
+                if len(valor_parte) > 1 and v0 == valor_parte[-1] and v0 in ("'", '"', '`'):
+                    valor = valor_parte[1: -1].replace('\\' + v0, v0)
+                else:
+                    valor = valor_parte
+
+                # Palavra do operador sem espaços ('eq', 'contains', ...)
+                return nome, grupo[0].strip(), valor
+
+    return [None] * 3
+
+
+# Traduz a consulta de filtro da DataTable em uma máscara booleana vetorizada
+def mascara_filtro(df, filter_query):
+    mascara = np.ones(len(df), dtype=bool)
+    if not filter_query:
+        return mascara
+    for parte in filter_query.split(' && '):
+        coluna, operador, valor = separar_filtro(parte)
+        if coluna not in df.columns:
+            continue
+        serie = df[coluna]
+        if operador in ('eq', 'ne', 'lt', 'le', 'gt', 'ge'):
+            if pd.api.types.is_numeric_dtype(serie):
+                try:
+                    valor = float(valor)
+                except ValueError:
+                    continue
+            else:
+                serie = serie.astype(str)
+            if operador == 'eq':
+                mascara &= (serie == valor).to_numpy()
+            elif operador == 'ne':
+                mascara &= (serie != valor).to_numpy()
+            elif operador == 'lt':
+                mascara &= (serie < valor).to_numpy()
+            elif operador == 'le':
+                mascara &= (serie <= valor).to_numpy()
+            elif operador == 'gt':
+                mascara &= (serie > valor).to_numpy()
+            else:
+                mascara &= (serie >= valor).to_numpy()
+        elif operador == 'contains':
+            mascara &= serie.astype(str).str.contains(str(valor), regex=False).to_numpy()
+        elif operador == 'datestartswith':
+            mascara &= serie.astype(str).str.startswith(str(valor)).to_numpy()
+    return mascara
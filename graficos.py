@@ -0,0 +1,113 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import altair as alt
+import pandas as pd
+
+from classificacao import contagem_por_faixa
+
+# Gráficos do painel (app.py): votos por bairro e distribuição de locais por
+# faixa de valores. As especificações Vega-Lite ficam num cache LRU do
+# processo, compartilhado entre sessões e indexado por (gráfico, tipo de voto,
+# modo, hash dos filtros); cada gráfico só é montado quando um container o
+# exibe e ainda não está no cache.
+
+TAMANHO_CACHE_GRAFICOS = int(os.environ.get('PAINEL_CACHE_GRAFICOS', 128))
+
+_especificacoes = OrderedDict()
+_trava = threading.Lock()
+
+
+def hash_filtros(*selecoes):
+    h = hashlib.sha1()
+    for selecao in selecoes:
+        h.update(repr(sorted(map(str, selecao))).encode())
+        h.update(b'|')
+    return h.hexdigest()
+
+
+def especificacao(chave, construir):
+    with _trava:
+        if chave in _especificacoes:
+            _especificacoes.move_to_end(chave)
+            return dict(_especificacoes[chave])
+    spec = construir().to_dict()
+    with _trava:
+        _especificacoes[chave] = spec
+        _especificacoes.move_to_end(chave)
+        while len(_especificacoes) > TAMANHO_CACHE_GRAFICOS:
+            _especificacoes.popitem(last=False)
+    # Cópia rasa: o Streamlit pode remover chaves do topo da especificação
+    return dict(spec)
+
+
+def criar_graficos(cubo, zona_selecionada, bairro_selecionado, voto_selecionado, titulo_valor, modo_visualizacao):
+    if modo_visualizacao == "Proporção (%)":
+        # Somatório por bairro a partir do cubo e cálculo da proporção
+        df_agrupado = cubo.por_bairro(zona_selecionada, bairro_selecionado, [voto_selecionado, 'VOTOS APTOS'])
+        df_agrupado['Proporção (%)'] = (df_agrupado[voto_selecionado] / df_agrupado['VOTOS APTOS']) * 100
+        grafico_barras = alt.Chart(df_agrupado).mark_bar().encode(
+            x=alt.X('BAIRRO:N', title="Bairro"),
+            y=alt.Y('Proporção (%)', title="Proporção (%)"),
+            color=alt.Color('BAIRRO:N', legend=None),
+            tooltip=['BAIRRO', 'Proporção (%)']
+        ).properties(
+            width=600,
+            height=400,
+            title='Proporção de Votos por Bairro'
+        ).configure_axis(
+            labelFontSize=12,
+            titleFontSize=14
+        ).configure_title(
+            fontSize=16
+        )
+    else:
+        # Somatório por bairro a partir do cubo
+        df_agrupado = cubo.por_bairro(zona_selecionada, bairro_selecionado, [voto_selecionado])
+        grafico_barras = alt.Chart(df_agrupado).mark_bar().encode(
+            x=alt.X('BAIRRO:N', title="Bairro"),
+            y=alt.Y(voto_selecionado, title=titulo_valor),
+            color=alt.Color('BAIRRO:N', legend=None),
+            tooltip=['BAIRRO', voto_selecionado]
+        ).properties(
+            width=600,
+            height=400,
+            title='Quantidade de Votos por Bairro'
+        ).configure_axis(
+            labelFontSize=12,
+            titleFontSize=14
+        ).configure_title(
+            fontSize=16
+        )
+    
+    return grafico_barras
+
+
+def criar_grafico_distribuicao(df, valor_exibido, bins, labels):
+    # Contar o número de locais por faixa, com os mesmos limites e a mesma
+    # regra de atribuição do mapa e da legenda
+    df_distribuicao = pd.DataFrame({
+        'Faixa de Valores': labels,
+        'Número de Locais': contagem_por_faixa(df[valor_exibido].to_numpy(), bins),
+    })
+    
+    # Criar o gráfico de barras
+    grafico_distribuicao = alt.Chart(df_distribuicao).mark_bar().encode(
+        x=alt.X('Faixa de Valores:O', title='Faixa de Valores', sort=labels),
+        y=alt.Y('Número de Locais:Q', title='Número de Locais'),
+        color=alt.Color('Faixa de Valores:O', legend=None),
+        tooltip=['Faixa de Valores', 'Número de Locais']
+    ).properties(
+        width=600,
+        height=400,
+        title='Distribuição de Locais de Votação por Faixa de Valores'
+    ).configure_axis(
+        labelFontSize=12,
+        titleFontSize=14
+    ).configure_title(
+        fontSize=16
+    )
+    
+    return grafico_distribuicao
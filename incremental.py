@@ -0,0 +1,145 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from chaves import chave_local, zona_da_chave
+from esquema import aplicar_esquema
+from ingestao import CHAVES, QUANTIDADES, TAMANHO_BLOCO, TIPOS_SECAO, agregar_bloco, montar_pivot, somar_parciais
+from secoes import existe_base_secoes, gravar_secoes
+
+# Reagregação incremental: o estado por seção (nr_zona, nr_secao) fica salvo
+# em disco junto com o dt_carga de cada seção. A cada nova publicação do TSE
+# só as seções novas ou com dt_carga diferente são aplicadas, e só as linhas
+# dos locais de votação afetados são recalculadas no CSV consolidado (e as
+# partições de zona afetadas na base de seções, quando ela existir).
+#
+# Cada CSV consolidado tem o seu próprio estado (cache/estado_secoes_<saida>
+# .parquet), então os dois turnos, ou eleições diferentes, não se misturam.
+# O estado só é gravado depois que o CSV foi reescrito: se a reescrita
+# falhar, a próxima execução volta a aplicar as mesmas seções.
+
+SAIDA_PADRAO = 'votos_cwb_pref1T_locvot.csv'
+PASTA_ESTADOS = 'cache'
+
+CHAVES_SECAO = ['nr_zona', 'nr_secao']
+CHAVES_ESTADO = list(dict.fromkeys(CHAVES_SECAO + CHAVES))
+COLUNAS_ESTADO = CHAVES_ESTADO + QUANTIDADES + ['dt_carga']
+TIPOS_SECAO_CARGA = dict(TIPOS_SECAO, dt_carga='category')
+
+
+def caminho_estado(saida, pasta=PASTA_ESTADOS):
+    nome = os.path.splitext(os.path.basename(saida))[0]
+    return os.path.join(pasta, f'estado_secoes_{nome}.parquet')
+
+
+def ler_estado(caminho):
+    if os.path.exists(caminho):
+        return pd.read_parquet(caminho)
+    return pd.DataFrame({col: pd.Series(dtype=TIPOS_SECAO_CARGA.get(col, 'int64')) for col in COLUNAS_ESTADO})
+
+
+def salvar_estado(estado, caminho):
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    temporario = caminho + '.tmp'
+    estado.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+
+def cargas_por_secao(df):
+    chave = chave_local(df['nr_zona'], df['nr_secao'])
+    return pd.Series(df['dt_carga'].astype(str).to_numpy(), index=chave).groupby(level=0).first()
+
+
+# Lê o arquivo por blocos e devolve apenas as seções novas ou alteradas,
+# agregadas por (nr_zona, nr_secao, nr_local_votacao, nm_votavel)
+def secoes_alteradas(caminho, cargas_atuais, tamanho_bloco=TAMANHO_BLOCO):
+    colunas = COLUNAS_ESTADO
+    chaves = CHAVES_ESTADO + ['dt_carga']
+    acumulado = None
+    for bloco in pd.read_csv(
+        caminho, sep=';', encoding='latin1', usecols=colunas,
+        dtype={col: TIPOS_SECAO_CARGA[col] for col in colunas}, chunksize=tamanho_bloco
+    ):
+        chave = chave_local(bloco['nr_zona'], bloco['nr_secao'])
+        carga_anterior = cargas_atuais.reindex(chave).to_numpy()
+        mudou = carga_anterior != bloco['dt_carga'].astype(str).to_numpy()
+        if mudou.any():
+            acumulado = somar_parciais(acumulado, agregar_bloco(bloco[mudou], chaves))
+    if acumulado is None:
+        return None
+    return acumulado.reset_index()
+
+
+# A base de seções do detalhamento (secoes.py) acompanha só o CSV do painel
+# (padrão: quando a saída é SAIDA_PADRAO)
+def atualizar_incremental(caminho, saida=SAIDA_PADRAO, estado_path=None, tamanho_bloco=TAMANHO_BLOCO,
+                          atualizar_secoes=None):
+    estado_path = estado_path or caminho_estado(saida)
+    if atualizar_secoes is None:
+        atualizar_secoes = os.path.abspath(saida) == os.path.abspath(SAIDA_PADRAO)
+    estado = ler_estado(estado_path)
+    novas = secoes_alteradas(caminho, cargas_por_secao(estado), tamanho_bloco)
+    if novas is None:
+        return 0
+
+    # Substituir no estado as seções alteradas
+    chave_novas = np.unique(chave_local(novas['nr_zona'], novas['nr_secao']))
+    chave_estado = chave_local(estado['nr_zona'], estado['nr_secao'])
+    substituidas = np.isin(chave_estado, chave_novas)
+
+    # Locais afetados: os das seções alteradas, antes e depois da mudança
+    afetados = np.union1d(
+        chave_local(estado['nr_zona'][substituidas], estado['nr_local_votacao'][substituidas]),
+        chave_local(novas['nr_zona'], novas['nr_local_votacao'])
+    )
+
+    estado = pd.concat([estado[~substituidas], novas[COLUNAS_ESTADO]], ignore_index=True)
+    estado['dt_carga'] = estado['dt_carga'].astype('category')
+
+    # Recalcular apenas os locais afetados
+    do_local = np.isin(chave_local(estado['nr_zona'], estado['nr_local_votacao']), afetados)
+    recalculado = montar_pivot(
+        estado[do_local].groupby(CHAVES, observed=True)[QUANTIDADES].sum().reset_index()
+    )
+    reescrever_locais(saida, recalculado, afetados)
+
+    # A base de seções do detalhamento, se existir, acompanha o estado:
+    # só as partições das zonas afetadas são regravadas
+    if atualizar_secoes and existe_base_secoes():
+        gravar_secoes(estado, zonas=set(zona_da_chave(afetados).tolist()))
+
+    salvar_estado(estado, estado_path)
+    return len(afetados)
+
+
+def reescrever_locais(saida, recalculado, afetados):
+    if os.path.exists(saida):
+        atual = pd.read_csv(saida, dtype={'zon_loc': str})
+        manter = ~np.isin(chave_local(atual['nr_zona'], atual['nr_local_votacao']), afetados)
+        colunas = list(dict.fromkeys(list(atual.columns) + list(recalculado.columns)))
+        junto = pd.concat([atual[manter], recalculado], ignore_index=True)[colunas]
+    else:
+        junto = recalculado
+
+    # Candidatos sem votos em algum local ficam com 0, como no pivot_table
+    junto = junto.fillna(0)
+    ordem = np.argsort(chave_local(junto['nr_zona'], junto['nr_local_votacao']), kind='stable')
+    junto = junto.iloc[ordem]
+    junto = aplicar_esquema(junto)
+
+    temporario = saida + '.tmp'
+    junto.to_csv(temporario, index=False, encoding='utf-8')
+    os.replace(temporario, saida)
+
+
+# Uso:
+#   python incremental.py votacao_secao-zona_2024_pr_curitiba.csv [saida.csv] [--estado estado.parquet]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Reagregação incremental de um arquivo de seções do TSE")
+    parser.add_argument('arquivo')
+    parser.add_argument('saida', nargs='?', default=SAIDA_PADRAO)
+    parser.add_argument('--estado', default=None, help="estado por seção (padrão: derivado da saída)")
+    args = parser.parse_args()
+    print(f"{atualizar_incremental(args.arquivo, args.saida, args.estado)} locais de votação atualizados")
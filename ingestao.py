@@ -0,0 +1,108 @@
+import pandas as pd
+
+from chaves import chave_local, local_da_chave, zona_da_chave
+from esquema import aplicar_esquema
+
+# Leitura em blocos (chunks) do CSV de votação por seção do TSE.
+# Apenas as colunas necessárias são lidas, com tipos compactos, e cada bloco é
+# somado a um agregado por (nr_zona, nr_local_votacao, nm_votavel). Assim o pico
+# de memória depende do número de locais de votação e não do número de linhas.
+
+CHAVES_LOCAL = ['nr_zona', 'nr_local_votacao']
+CHAVES = CHAVES_LOCAL + ['nm_votavel']
+QUANTIDADES = ['qt_aptos', 'qt_abstencoes', 'qt_votos_nominais', 'qt_votos']
+
+TIPOS_SECAO = {
+    'cd_eleicao': 'int32',
+    'cd_municipio': 'int32',
+    'nr_zona': 'int16',
+    'nr_local_votacao': 'int32',
+    'nr_secao': 'int32',
+    'nm_votavel': 'category',
+    'qt_aptos': 'int32',
+    'qt_abstencoes': 'int32',
+    'qt_votos_nominais': 'int32',
+    'qt_votos': 'int32',
+}
+
+# Nomes usados no CSV consolidado lido pelos painéis
+NOMES_TOTAIS = {
+    'qt_aptos': 'VOTOS APTOS',
+    'qt_abstencoes': 'ABSTENÇÕES',
+    'qt_votos_nominais': 'VOTOS NOMINAIS',
+}
+BRANCOS_NULOS = ['VOTO BRANCO', 'VOTO NULO']
+
+TAMANHO_BLOCO = 500_000
+
+
+def ler_secoes(caminho, colunas=None, tamanho_bloco=TAMANHO_BLOCO):
+    colunas = colunas or CHAVES + QUANTIDADES
+    tipos = {col: TIPOS_SECAO.get(col, 'category') for col in colunas}
+    return pd.read_csv(
+        caminho, sep=';', encoding='latin1',
+        usecols=colunas, dtype=tipos, chunksize=tamanho_bloco
+    )
+
+
+def agregar_bloco(bloco, chaves=CHAVES):
+    parcial = bloco.groupby(chaves, observed=True, sort=False)[QUANTIDADES].sum()
+    # Níveis categóricos de blocos diferentes têm categorias diferentes;
+    # convertê-los em texto permite somar os parciais entre si.
+    parcial.index = pd.MultiIndex.from_arrays(
+        [parcial.index.get_level_values(i).astype(str)
+         if isinstance(parcial.index.levels[i], pd.CategoricalIndex)
+         else parcial.index.get_level_values(i)
+         for i in range(parcial.index.nlevels)],
+        names=parcial.index.names
+    )
+    return parcial.astype('int64')
+
+
+def somar_parciais(acumulado, parcial):
+    if acumulado is None:
+        return parcial
+    return pd.concat([acumulado, parcial]).groupby(level=list(range(parcial.index.nlevels))).sum()
+
+
+# Parcial indexado pelas chaves (None sem linhas); 'caminho' também pode ser
+# um arquivo aberto, como um trecho do CSV (lote.py)
+def agregar_parcial(caminho, chaves=CHAVES, tamanho_bloco=TAMANHO_BLOCO):
+    colunas = list(dict.fromkeys(chaves + QUANTIDADES))
+    acumulado = None
+    for bloco in ler_secoes(caminho, colunas, tamanho_bloco):
+        acumulado = somar_parciais(acumulado, agregar_bloco(bloco, chaves))
+    return acumulado
+
+
+def agregar_secoes(caminho, chaves=CHAVES, tamanho_bloco=TAMANHO_BLOCO):
+    acumulado = agregar_parcial(caminho, chaves, tamanho_bloco)
+    if acumulado is None:
+        return pd.DataFrame(columns=chaves + QUANTIDADES)
+    return acumulado.sort_index().reset_index()
+
+
+# Monta a tabela larga por local de votação (uma coluna por candidato),
+# no mesmo formato de votos_cwb_pref1T_locvot.csv e com o esquema compacto
+# (contagens uint32). Agrupamentos e junção usam a chave inteira 'id_local';
+# 'zon_loc' só é gerado na saída.
+def montar_pivot(df):
+    df = df.copy()
+    df['id_local'] = chave_local(df['nr_zona'], df['nr_local_votacao'])
+
+    df_agrupado2 = df.groupby('id_local').agg({
+        'qt_aptos': 'max',
+        'qt_abstencoes': 'max',
+        'qt_votos_nominais': 'max'
+    }).rename(columns=NOMES_TOTAIS)
+
+    df_pivot = df.pivot_table(index='id_local', columns='nm_votavel', values='qt_votos', aggfunc='sum', fill_value=0)
+    df_pivot.columns.name = None
+
+    df_junto = df_agrupado2.join(df_pivot, how='inner').reset_index()
+    zona = zona_da_chave(df_junto['id_local'])
+    local = local_da_chave(df_junto['id_local'])
+    df_junto.insert(4, 'zon_loc', pd.Series(zona).astype(str).str.cat(pd.Series(local).astype(str), sep='_'))
+    df_junto.insert(5, 'nr_local_votacao', local)
+    df_junto.insert(6, 'nr_zona', zona)
+    return aplicar_esquema(df_junto.drop(columns='id_local'))
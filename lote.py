@@ -0,0 +1,107 @@
+import argparse
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+import pandas as pd
+
+from ingestao import CHAVES, QUANTIDADES, agregar_parcial, montar_pivot, somar_parciais
+
+# Processamento em lote de arquivos de seção (vários municípios e eleições,
+# ou um único arquivo estadual). Cada arquivo é dividido em trechos de bytes
+# alinhados ao início das linhas, e cada trecho é agregado em um processo
+# separado; assim um único CSV grande também usa todos os processos. Os
+# parciais são somados em ordem fixa (arquivo, trecho) com somar_parciais, e
+# a tabela larga de cada (eleição, município) também é montada em paralelo,
+# gerando um CSV por município.
+
+CHAVES_LOTE = ['cd_eleicao', 'cd_municipio'] + CHAVES
+BYTES_POR_TRECHO = 64 * 1024 * 1024
+
+
+# Lê só os bytes [inicio, fim) de um CSV, precedidos pela linha de cabeçalho
+class TrechoArquivo(io.RawIOBase):
+    def __init__(self, caminho, inicio, fim):
+        self.arquivo = open(caminho, 'rb')
+        self.cabecalho = self.arquivo.readline()
+        self.arquivo.seek(inicio)
+        self.restante = fim - inicio
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.cabecalho:
+            n = min(len(buffer), len(self.cabecalho))
+            buffer[:n] = self.cabecalho[:n]
+            self.cabecalho = self.cabecalho[n:]
+            return n
+        n = min(len(buffer), self.restante)
+        if n <= 0:
+            return 0
+        lidos = self.arquivo.readinto(memoryview(buffer)[:n])
+        self.restante -= lidos
+        return lidos
+
+    def close(self):
+        self.arquivo.close()
+        super().close()
+
+
+# Trechos (caminho, inicio, fim) de até ~bytes_por_trecho, cada um começando
+# no início de uma linha de dados
+def dividir_arquivo(caminho, bytes_por_trecho=BYTES_POR_TRECHO):
+    tamanho = os.path.getsize(caminho)
+    with open(caminho, 'rb') as f:
+        f.readline()
+        limites = [f.tell()]
+        while tamanho - limites[-1] > bytes_por_trecho:
+            f.seek(limites[-1] + bytes_por_trecho - 1)
+            f.readline()
+            limites.append(f.tell())
+    limites.append(tamanho)
+    return [(caminho, inicio, fim) for inicio, fim in zip(limites[:-1], limites[1:]) if fim > inicio]
+
+
+def agregar_trecho(trecho):
+    with io.BufferedReader(TrechoArquivo(*trecho)) as arquivo:
+        return agregar_parcial(arquivo, chaves=CHAVES_LOTE)
+
+
+def montar_municipio(args):
+    (cd_eleicao, cd_municipio), df, pasta_saida = args
+    destino = os.path.join(pasta_saida, f'votos_{cd_eleicao}_{cd_municipio}_locvot.csv')
+    montar_pivot(df.drop(columns=['cd_eleicao', 'cd_municipio'])).to_csv(destino, index=False, encoding='utf-8')
+    return destino
+
+
+def processar_lote(arquivos, pasta_saida, processos=None, bytes_por_trecho=BYTES_POR_TRECHO):
+    os.makedirs(pasta_saida, exist_ok=True)
+    trechos = [trecho for caminho in sorted(arquivos) for trecho in dividir_arquivo(caminho, bytes_por_trecho)]
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        # map devolve os resultados na ordem dos trechos, o que torna a
+        # junção determinística independentemente de qual processo termina
+        # antes; o mesmo local (e município) pode aparecer em vários trechos
+        parciais = [parcial for parcial in executor.map(agregar_trecho, trechos) if parcial is not None]
+        if not parciais:
+            return []
+        agregado = reduce(somar_parciais, parciais, None).sort_index().reset_index()
+
+        tarefas = [(chave, grupo, pasta_saida) for chave, grupo in agregado.groupby(['cd_eleicao', 'cd_municipio'], sort=True)]
+        return list(executor.map(montar_municipio, tarefas))
+
+
+# Uso:
+#   python lote.py saida/ votacao_secao_2024_PR.csv votacao_secao_2024_SC.csv -p 32
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Agrega vários arquivos de seção do TSE por município")
+    parser.add_argument('pasta_saida')
+    parser.add_argument('arquivos', nargs='+')
+    parser.add_argument('-p', '--processos', type=int, default=None, help="número de processos (padrão: número de núcleos)")
+    parser.add_argument('-t', '--trecho-mb', type=int, default=BYTES_POR_TRECHO // (1024 * 1024),
+                        help="tamanho dos trechos de cada arquivo agregados em paralelo, em MB")
+    args = parser.parse_args()
+
+    for destino in processar_lote(args.arquivos, args.pasta_saida, args.processos, args.trecho_mb * 1024 * 1024):
+        print(destino)
@@ -0,0 +1,90 @@
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+
+# Dados enviados ao navegador pela camada do pydeck. Em vez do GeoDataFrame
+# inteiro (todas as propriedades do GeoJSON e a geometria shapely), monta
+# uma tabela só com as colunas usadas pela camada e pelo tooltip, com
+# coordenadas arredondadas (5 casas ~ 1 m) para encurtar o JSON.
+
+CASAS_COORDENADAS = 5
+
+
+def montar_dados_mapa(df, colunas_estilo, colunas_tooltip, casas=CASAS_COORDENADAS):
+    dados = {
+        'lon': np.round(df['lon'].to_numpy(dtype=np.float64), casas),
+        'lat': np.round(df['lat'].to_numpy(dtype=np.float64), casas),
+    }
+    for col in list(colunas_estilo) + list(colunas_tooltip):
+        if col in dados:
+            continue
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype) and pd.api.types.is_numeric_dtype(serie.cat.categories):
+            serie = serie.astype(np.float64)
+        valores = serie.to_numpy()
+        if np.issubdtype(valores.dtype, np.floating):
+            # Raios e proporções não precisam de mais que duas casas
+            valores = np.round(valores.astype(np.float64), 2)
+        dados[col] = valores
+    return pd.DataFrame(dados)
+
+
+# Camada de pontos do painel (app.py), com cor e raio vindos das colunas de estilo
+def camada_pontos(dados_mapa):
+    return pdk.Layer(
+        "ScatterplotLayer",
+        data=dados_mapa,
+        get_position='[lon, lat]',
+        get_fill_color='[cor_r, cor_g, cor_b, cor_a]',
+        get_line_color=[0, 0, 0],  # Bordas pretas
+        get_line_width= 10,
+        get_radius="radius",
+        pickable=True,
+        auto_highlight=True
+    )
+
+
+# Expressão do deck.gl que escolhe, pelo valor da feição, a posição de
+# 'saidas' correspondente ao bin (mesma regra de codigos_bins)
+def expressao_bins(valor, bins, saidas):
+    saidas = [str([int(c) for c in saida]) if isinstance(saida, (list, tuple)) else str(float(saida))
+              for saida in saidas]
+    expressao = saidas[-1]
+    for limite, saida in zip(reversed(list(bins[1:-1])), reversed(saidas[:-1])):
+        expressao = f"{valor} <= {float(limite)} ? {saida} : {expressao}"
+    return expressao
+
+
+# Camadas MVTLayer servidas pelo servidor_tiles.py: bairros (contorno) e
+# locais de votação do tipo de voto escolhido, coloridos no navegador pelos
+# mesmos bins e paleta da camada de pontos
+def camadas_mvt(url_tiles, voto, proporcao, bins, cores, raios):
+    if proporcao:
+        valor = "(properties.aptos > 0 ? properties.votos * 100 / properties.aptos : 0)"
+    else:
+        valor = "properties.votos"
+    voto_url = quote(voto, safe='')
+    contornos = pdk.Layer(
+        "MVTLayer",
+        data=f"{url_tiles}/bairros/{{z}}/{{x}}/{{y}}.pbf",
+        binary=False,
+        filled=False,
+        get_line_color=[120, 120, 120],
+        line_width_min_pixels=1,
+    )
+    pontos = pdk.Layer(
+        "MVTLayer",
+        data=f"{url_tiles}/locais/{voto_url}/{{z}}/{{x}}/{{y}}.pbf",
+        binary=False,
+        point_type='circle',
+        get_fill_color=expressao_bins(valor, bins, cores),
+        get_point_radius=expressao_bins(valor, bins, raios),
+        point_radius_units='meters',
+        get_line_color=[0, 0, 0],
+        line_width_min_pixels=1,
+        pickable=True,
+        auto_highlight=True,
+    )
+    return [contornos, pontos]
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from esquema import SUFIXO_APTOS, SUFIXO_VALIDOS, TIPO_CONTAGEM, TIPO_PROPORCAO, colunas_proporcao, colunas_votos
+from ingestao import BRANCOS_NULOS, NOMES_TOTAIS
+
+# Métricas derivadas por local de votação, calculadas uma vez sobre a tabela
+# larga (depois do pivot e da junção com os locais) e guardadas no cache
+# junto com as contagens, de modo que os painéis só leem colunas:
+#   COMPARECIMENTO, COMPARECIMENTO (%)
+#   <voto> (%)          votos em % dos votos aptos (inclui ABSTENÇÕES (%))
+#   <candidato> (% VÁLIDOS)
+#   VENCEDOR, SEGUNDO, MARGEM (votos) e MARGEM (% VÁLIDOS)
+# As contagens são uint32: diferenças são feitas em int64 para não dar a
+# volta abaixo de zero. As proporções ficam em float32 (esquema.py).
+
+APTOS = NOMES_TOTAIS['qt_aptos']
+ABSTENCOES = NOMES_TOTAIS['qt_abstencoes']
+VALIDOS = NOMES_TOTAIS['qt_votos_nominais']
+
+
+def colunas_candidatos(df):
+    return [col for col in colunas_votos(df) if col not in NOMES_TOTAIS.values() and col not in BRANCOS_NULOS]
+
+
+def percentual(parte, total):
+    parte = np.asarray(parte, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    return np.round(np.divide(parte * 100, total, out=np.zeros(np.broadcast(parte, total).shape), where=total > 0), 1)
+
+
+def calcular_metricas(df):
+    aptos = df[APTOS].to_numpy(dtype=np.int64)
+    validos = df[VALIDOS].to_numpy(dtype=np.int64)
+    metricas = {}
+
+    comparecimento = np.clip(aptos - df[ABSTENCOES].to_numpy(dtype=np.int64), 0, None)
+    metricas['COMPARECIMENTO'] = comparecimento.astype(TIPO_CONTAGEM)
+    metricas['COMPARECIMENTO' + SUFIXO_APTOS] = percentual(comparecimento, aptos)
+
+    votos = colunas_votos(df)
+    for col, valores in zip(votos, percentual(df[votos].to_numpy(dtype=np.int64), aptos[:, None]).T):
+        metricas[col + SUFIXO_APTOS] = valores
+
+    candidatos = colunas_candidatos(df)
+    matriz = df[candidatos].to_numpy(dtype=np.int64)
+    for col, valores in zip(candidatos, percentual(matriz, validos[:, None]).T):
+        metricas[col + SUFIXO_VALIDOS] = valores
+
+    # Primeiro e segundo colocados de cada local (empate: ordem das colunas);
+    # as duas colunas de zeros cobrem disputas com menos de dois candidatos
+    completa = np.hstack([matriz, np.zeros((len(df), 2), dtype=np.int64)])
+    colocados = np.argsort(-completa, axis=1, kind='stable')[:, :2]
+    votos_colocados = np.take_along_axis(completa, colocados, axis=1)
+    codigos = np.where(votos_colocados > 0, colocados, -1)
+    metricas['VENCEDOR'] = pd.Categorical.from_codes(codigos[:, 0], categories=candidatos)
+    metricas['SEGUNDO'] = pd.Categorical.from_codes(codigos[:, 1], categories=candidatos)
+    votos_primeiro, votos_segundo = votos_colocados[:, 0], votos_colocados[:, 1]
+    margem = votos_primeiro - votos_segundo
+    metricas['MARGEM'] = margem.astype(TIPO_CONTAGEM)
+    metricas['MARGEM' + SUFIXO_VALIDOS] = percentual(margem, validos)
+    metricas = pd.DataFrame(metricas, index=df.index)
+    return metricas.astype(dict.fromkeys(colunas_proporcao(metricas), TIPO_PROPORCAO))
+
+
+# Acrescenta (ou recalcula) as métricas derivadas na tabela
+def adicionar_metricas(df):
+    return df.assign(**calcular_metricas(df))
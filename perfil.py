@@ -0,0 +1,192 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+# Perfil opcional das execuções do painel: tempo e pico de memória por seção
+# do script e por função cacheada (com acerto/falha de cache). Ativado pela
+# variável de ambiente PAINEL_PERFIL=1 ou pelo parâmetro ?perfil=1 na URL.
+# A medição de memória (tracemalloc, que vale para o processo inteiro e
+# deixa todas as alocações mais lentas) só é ligada pela variável de
+# ambiente; pelo parâmetro da URL o perfil mede apenas tempo e cache.
+# O pico do tracemalloc é um só no processo: antes de cada reset_peak() o
+# pico atual é repassado às medições abertas (de qualquer sessão), então
+# medições aninhadas ou simultâneas não apagam o pico umas das outras.
+# Com sessões simultâneas o pico inclui as alocações das outras sessões.
+# Uma execução interrompida (rerun ou exceção antes de fim()) deixa medições
+# abertas; descartar() as remove, e o app.py o chama no início da execução
+# seguinte da mesma sessão.
+# Os resultados aparecem num painel de depuração, vão para o log em JSON e
+# acumulam métricas no formato texto do Prometheus (opcionalmente gravadas em
+# PAINEL_PERFIL_PROM, para o textfile collector do node_exporter).
+
+VARIAVEL_ATIVACAO = 'PAINEL_PERFIL'
+VARIAVEL_PROMETHEUS = 'PAINEL_PERFIL_PROM'
+
+logger = logging.getLogger('painel.perfil')
+
+# Contadores do processo inteiro (compartilhados entre sessões)
+_trava = threading.Lock()
+_execucoes = {}           # função cacheada -> quantas vezes o corpo rodou
+_metricas_etapas = {}     # etapa -> [segundos acumulados, execuções]
+_metricas_cache = {}      # função -> [acertos, falhas]
+_picos_abertos = {}       # medição de memória aberta -> maior pico já visto
+
+# Funções cacheadas cujo corpo rodou na chamada em andamento desta thread
+# (o Streamlit executa o corpo na própria thread do script)
+_local = threading.local()
+
+
+def memoria_ativa():
+    return os.environ.get(VARIAVEL_ATIVACAO, '') not in ('', '0')
+
+
+def perfil_ativo(query_params=None):
+    if memoria_ativa():
+        return True
+    return bool(query_params) and query_params.get('perfil') not in (None, '', '0')
+
+
+# Decorador para funções sob @st.cache_data/@st.cache_resource: o corpo só
+# roda em falha de cache, então a contagem indica acerto ou falha
+def contar_execucoes(funcao):
+    @functools.wraps(funcao)
+    def envoltorio(*args, **kwargs):
+        with _trava:
+            _execucoes[funcao.__name__] = _execucoes.get(funcao.__name__, 0) + 1
+        executadas = getattr(_local, 'executadas', None)
+        if executadas is not None:
+            executadas.add(funcao.__name__)
+        return funcao(*args, **kwargs)
+    return envoltorio
+
+
+class Perfil:
+    def __init__(self, ativo, memoria=None):
+        self.ativo = ativo
+        self.memoria = ativo and (memoria_ativa() if memoria is None else memoria)
+        self.medicoes = []
+        self._aberta = None
+        self._chaves = set()      # medições de memória abertas deste perfil
+
+    def _medir_inicio(self):
+        if not self.memoria:
+            return time.perf_counter(), None
+        chave = object()
+        with _trava:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            _, pico = tracemalloc.get_traced_memory()
+            for aberta in _picos_abertos:
+                _picos_abertos[aberta] = max(_picos_abertos[aberta], pico)
+            tracemalloc.reset_peak()
+            atual, _ = tracemalloc.get_traced_memory()
+            _picos_abertos[chave] = atual
+            self._chaves.add(chave)
+        return time.perf_counter(), (chave, atual)
+
+    def _medir_fim(self, inicio):
+        tempo_inicio, memoria = inicio
+        segundos = time.perf_counter() - tempo_inicio
+        if memoria is None:
+            return segundos, None
+        chave, memoria_inicio = memoria
+        with _trava:
+            _, pico = tracemalloc.get_traced_memory()
+            pico = max(pico, _picos_abertos.pop(chave, 0))
+            self._chaves.discard(chave)
+        return segundos, (pico - memoria_inicio) / 2**20
+
+    def _registrar(self, medicao):
+        self.medicoes.append(medicao)
+        with _trava:
+            acumulado = _metricas_etapas.setdefault(medicao['etapa'], [0.0, 0])
+            acumulado[0] += medicao['segundos']
+            acumulado[1] += 1
+            if 'cache' in medicao:
+                cache = _metricas_cache.setdefault(medicao['etapa'], [0, 0])
+                cache[0 if medicao['cache'] == 'acerto' else 1] += 1
+
+    # Marca o início de uma seção do script, encerrando a anterior
+    def secao(self, nome):
+        if not self.ativo:
+            return
+        self.fim()
+        self._aberta = (nome, self._medir_inicio())
+
+    def fim(self):
+        if not self.ativo or self._aberta is None:
+            return
+        nome, inicio = self._aberta
+        segundos, memoria = self._medir_fim(inicio)
+        self._registrar({'etapa': nome, 'segundos': segundos, 'pico_memoria_mb': memoria})
+        self._aberta = None
+
+    # Abandona as medições ainda abertas (sem registrá-las)
+    def descartar(self):
+        with _trava:
+            for chave in self._chaves:
+                _picos_abertos.pop(chave, None)
+            self._chaves.clear()
+        self._aberta = None
+
+    def chamada_cacheada(self, funcao, *args, **kwargs):
+        if not self.ativo:
+            return funcao(*args, **kwargs)
+        nome = funcao.__name__
+        anteriores = getattr(_local, 'executadas', None)
+        _local.executadas = set()
+        inicio = self._medir_inicio()
+        try:
+            resultado = funcao(*args, **kwargs)
+        finally:
+            segundos, memoria = self._medir_fim(inicio)
+            falha = nome in _local.executadas
+            _local.executadas = anteriores
+        self._registrar({'etapa': nome, 'segundos': segundos, 'pico_memoria_mb': memoria,
+                         'cache': 'falha' if falha else 'acerto'})
+        return resultado
+
+    def emitir_log(self):
+        if not self.ativo:
+            return
+        logger.info(json.dumps({'evento': 'perfil_execucao', 'medicoes': self.medicoes}, ensure_ascii=False))
+        caminho = os.environ.get(VARIAVEL_PROMETHEUS)
+        if caminho:
+            with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+                f.write(metricas_prometheus())
+            os.replace(caminho + '.tmp', caminho)
+
+    def mostrar(self, st):
+        if not self.ativo:
+            return
+        with st.expander("Perfil da execução (depuração)", expanded=True):
+            st.dataframe(self.medicoes)
+            st.code(metricas_prometheus(), language='text')
+
+
+def metricas_prometheus():
+    linhas = [
+        '# HELP painel_etapa_segundos_total Tempo acumulado por etapa do painel.',
+        '# TYPE painel_etapa_segundos_total counter',
+    ]
+    with _trava:
+        etapas = sorted(_metricas_etapas.items())
+        caches = sorted(_metricas_cache.items())
+    linhas += [f'painel_etapa_segundos_total{{etapa="{etapa}"}} {segundos:.6f}' for etapa, (segundos, _) in etapas]
+    linhas += [
+        '# HELP painel_etapa_execucoes_total Execuções por etapa do painel.',
+        '# TYPE painel_etapa_execucoes_total counter',
+    ]
+    linhas += [f'painel_etapa_execucoes_total{{etapa="{etapa}"}} {n}' for etapa, (_, n) in etapas]
+    linhas += [
+        '# HELP painel_cache_total Chamadas a funções cacheadas por resultado.',
+        '# TYPE painel_cache_total counter',
+    ]
+    for funcao, (acertos, falhas) in caches:
+        linhas.append(f'painel_cache_total{{funcao="{funcao}",resultado="acerto"}} {acertos}')
+        linhas.append(f'painel_cache_total{{funcao="{funcao}",resultado="falha"}} {falhas}')
+    return '\n'.join(linhas) + '\n'
@@ -0,0 +1,141 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')  # Renderização sem interface gráfica
+import matplotlib.pyplot as plt
+import numpy as np
+
+from coropletico import ler_nivel
+from dados import PASTA_CACHE, carregar_dados
+from classificacao import classificar
+from estilo import codigos_bins, estilizar_pontos, raios_bins
+from votos_longos import de_tabela_larga
+
+# Geração em lote das imagens estáticas de mapas (pasta mapas/) para todos os
+# tipos de voto, em números absolutos e em proporção dos votos aptos. As
+# imagens são renderizadas em paralelo e só são refeitas quando os dados de
+# entrada (ou a versão do renderizador) mudam.
+
+PASTA_MAPAS = 'mapas'
+MANIFESTO = os.path.join(PASTA_CACHE, 'mapas_manifesto.json')
+VERSAO_RENDER = 3
+ZOOM_FUNDO = 12
+NUM_BINS = 5
+
+MODOS = {
+    'abs': "Números Absolutos",
+    'perc': "Proporção (%)",
+}
+
+
+def nome_arquivo(voto, modo):
+    texto = unicodedata.normalize('NFKD', voto).encode('ascii', 'ignore').decode().lower()
+    return re.sub(r'[^a-z0-9]+', '_', texto).strip('_') + f'_{modo}.png'
+
+
+def valores_mapa(df, voto, modo):
+    if modo == 'perc':
+        aptos = df['VOTOS APTOS'].to_numpy(dtype=np.float64)
+        valores = np.divide(df[voto].to_numpy(dtype=np.float64) * 100, aptos,
+                            out=np.zeros(len(aptos)), where=aptos > 0)
+        return np.round(valores, 1)
+    return df[voto].to_numpy(dtype=np.float64)
+
+
+def impressao_digital(*arrays):
+    h = hashlib.sha1(str(VERSAO_RENDER).encode())
+    for arr in arrays:
+        h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()
+
+
+def renderizar(tarefa):
+    voto, modo, lon, lat, valores, destino = tarefa
+    bins, rotulos = classificar(valores, NUM_BINS)
+    num_bins = len(rotulos)
+    raio, cor = estilizar_pontos(codigos_bins(valores, bins), num_bins)
+
+    fig, ax = plt.subplots(figsize=(8, 10), dpi=150)
+    ler_nivel(ZOOM_FUNDO).boundary.plot(ax=ax, color='#999999', linewidth=0.4)
+    # Área do marcador proporcional ao raio usado no mapa interativo
+    ax.scatter(lon, lat, s=(raio / 40.0) ** 2, c=cor / 255.0, edgecolors='black', linewidths=0.3)
+
+    # Legenda com uma bolinha de exemplo por faixa
+    for i, (tamanho, rotulo) in enumerate(zip(raios_bins(num_bins), rotulos)):
+        ax.scatter([], [], s=(tamanho / 40.0) ** 2, color=np.array(cor_bin(i, num_bins)) / 255.0,
+                   edgecolors='black', linewidths=0.3, label=rotulo)
+    ax.legend(title=MODOS[modo], loc='lower left', fontsize=7, title_fontsize=8, frameon=True,
+              markerscale=0.5, labelspacing=1.2)
+
+    ax.set_title(voto)
+    ax.set_axis_off()
+    fig.savefig(destino, bbox_inches='tight')
+    plt.close(fig)
+    return destino
+
+
+def cor_bin(i, num_bins):
+    _, cor = estilizar_pontos(np.array([i]), num_bins)
+    return cor[0]
+
+
+def ler_manifesto(caminho=MANIFESTO):
+    if os.path.exists(caminho):
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def salvar_manifesto(manifesto, caminho=MANIFESTO):
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(caminho + '.tmp', caminho)
+
+
+def gerar_mapas(votes_path, geojson_path, pasta=PASTA_MAPAS, processos=None, forcar=False):
+    df = carregar_dados(votes_path, geojson_path)
+    ler_nivel(ZOOM_FUNDO)  # Gera o fundo de bairros antes de abrir os processos
+    lon = df['lon'].to_numpy(dtype=np.float64)
+    lat = df['lat'].to_numpy(dtype=np.float64)
+    os.makedirs(pasta, exist_ok=True)
+
+    manifesto = ler_manifesto()
+    tarefas, digitais = [], {}
+    for voto in de_tabela_larga(df).opcoes():
+        for modo in MODOS:
+            valores = valores_mapa(df, voto, modo)
+            destino = os.path.join(pasta, nome_arquivo(voto, modo))
+            digital = impressao_digital(lon, lat, valores)
+            if not forcar and manifesto.get(destino) == digital and os.path.exists(destino):
+                continue
+            tarefas.append((voto, modo, lon, lat, valores, destino))
+            digitais[destino] = digital
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        for destino in executor.map(renderizar, tarefas):
+            manifesto[destino] = digitais[destino]
+            print(destino)
+
+    salvar_manifesto(manifesto)
+    return list(digitais)
+
+
+# Uso:
+#   python render_mapas.py [-p 8] [--forcar]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gera as imagens de mapas de votação em lote")
+    parser.add_argument('--votos', default='votos_cwb_pref1T_locvot.csv')
+    parser.add_argument('--locais', default='locais_votacao.geojson')
+    parser.add_argument('--pasta', default=PASTA_MAPAS)
+    parser.add_argument('-p', '--processos', type=int, default=None, help="número de processos (padrão: número de núcleos)")
+    parser.add_argument('--forcar', action='store_true', help="refaz todas as imagens, mesmo sem mudanças")
+    args = parser.parse_args()
+
+    gerar_mapas(args.votos, args.locais, args.pasta, args.processos, args.forcar)
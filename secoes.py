@@ -0,0 +1,91 @@
+import os
+import shutil
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ingestao import NOMES_TOTAIS, QUANTIDADES, TAMANHO_BLOCO, agregar_secoes
+
+# Base de seções (nr_secao) para o detalhamento dos locais de votação.
+# Os votos por (seção, candidato) ficam em Parquet particionado por zona
+# (cache/secoes/nr_zona=<zona>/secoes.parquet), ordenados por local e seção
+# e gravados em grupos de linhas pequenos: as estatísticas min/max de
+# nr_local_votacao de cada grupo funcionam como índice, e a leitura de um
+# local abre só o arquivo da sua zona e só os grupos que o contêm.
+
+PASTA_SECOES = os.path.join('cache', 'secoes')
+CHAVES_SECAO_LOCAL = ['nr_zona', 'nr_local_votacao', 'nr_secao', 'nm_votavel']
+COLUNAS_ARQUIVO = ['nr_local_votacao', 'nr_secao', 'nm_votavel'] + QUANTIDADES
+LINHAS_POR_GRUPO = 4096
+
+
+def caminho_zona(nr_zona, pasta=PASTA_SECOES):
+    return os.path.join(pasta, f'nr_zona={int(nr_zona)}', 'secoes.parquet')
+
+
+# Grava (ou regrava) as partições das zonas presentes em 'secoes', uma
+# tabela longa com CHAVES_SECAO_LOCAL + QUANTIDADES; com 'zonas', só essas
+def gravar_secoes(secoes, pasta=PASTA_SECOES, zonas=None):
+    for nr_zona, grupo in secoes.groupby('nr_zona', sort=True):
+        if zonas is not None and nr_zona not in zonas:
+            continue
+        grupo = grupo.sort_values(['nr_local_votacao', 'nr_secao', 'nm_votavel'])
+        grupo = grupo[COLUNAS_ARQUIVO].astype({
+            'nr_local_votacao': 'int32',
+            'nr_secao': 'int32',
+            'nm_votavel': 'category',
+            **{col: 'int32' for col in QUANTIDADES},
+        })
+        destino = caminho_zona(nr_zona, pasta)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        tabela = pa.Table.from_pandas(grupo, preserve_index=False)
+        pq.write_table(tabela, destino + '.tmp', row_group_size=LINHAS_POR_GRUPO, write_statistics=True)
+        os.replace(destino + '.tmp', destino)
+
+
+def construir_secoes(caminho, pasta=PASTA_SECOES, tamanho_bloco=TAMANHO_BLOCO):
+    secoes = agregar_secoes(caminho, CHAVES_SECAO_LOCAL, tamanho_bloco)
+    # Zonas que sumiram da publicação não podem deixar partições antigas
+    if os.path.isdir(pasta):
+        shutil.rmtree(pasta)
+    gravar_secoes(secoes, pasta)
+    return secoes['nr_zona'].nunique()
+
+
+def existe_base_secoes(pasta=PASTA_SECOES):
+    return os.path.isdir(pasta)
+
+
+# Tabela longa (seção, candidato) de um único local de votação
+def secoes_do_local(nr_zona, nr_local_votacao, pasta=PASTA_SECOES):
+    destino = caminho_zona(nr_zona, pasta)
+    if not os.path.exists(destino):
+        return pd.DataFrame(columns=COLUNAS_ARQUIVO)
+    tabela = pq.read_table(destino, filters=[('nr_local_votacao', '=', int(nr_local_votacao))], memory_map=True)
+    return tabela.to_pandas()
+
+
+# Uma linha por seção, com as mesmas colunas do CSV consolidado por local.
+# Com 'opcoes' (os tipos de voto do painel), os votáveis sem votos no local
+# também viram colunas, com zero
+def tabela_secoes(longo, opcoes=None):
+    if longo.empty:
+        return pd.DataFrame(columns=['nr_secao'] + list(NOMES_TOTAIS.values()))
+    totais = longo.groupby('nr_secao')[list(NOMES_TOTAIS)].max().rename(columns=NOMES_TOTAIS)
+    votos = longo.pivot_table(index='nr_secao', columns='nm_votavel', values='qt_votos',
+                              aggfunc='sum', fill_value=0, observed=True)
+    votos.columns = votos.columns.astype(str)
+    votos.columns.name = None
+    if opcoes is not None:
+        extras = [col for col in votos.columns if col not in opcoes]
+        votaveis = [col for col in opcoes if col not in NOMES_TOTAIS.values()]
+        votos = votos.reindex(columns=votaveis + extras, fill_value=0)
+    return totais.join(votos).reset_index()
+
+
+# Uso:
+#   python secoes.py votacao_secao-zona_2024_pr_curitiba.csv
+if __name__ == '__main__':
+    print(f"{construir_secoes(sys.argv[1])} zonas gravadas em {PASTA_SECOES}")
@@ -0,0 +1,227 @@
+import argparse
+import hashlib
+import logging
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import mapbox_vector_tile
+import numpy as np
+import shapely
+
+from agrupamento import RAIO_TERRA, mercator
+from atualizador import Atualizador
+from bairros import DIVISA_BAIRROS
+from cache_resultados import CacheResultados
+from coropletico import ler_nivel, nivel_para_zoom
+from dados import PASTA_CACHE
+from esquema import colunas_votos
+
+# Servidor local de tiles vetoriais (Mapbox Vector Tiles) para o mapa do
+# painel: /locais/<tipo de voto>/{z}/{x}/{y}.pbf traz os locais de votação
+# com os votos do tipo escolhido e os votos aptos, e /bairros/{z}/{x}/{y}.pbf
+# traz os polígonos da divisa de bairros (simplificados para o zoom). O
+# navegador só busca os tiles visíveis, em vez de receber todos os pontos
+# dentro da especificação do pydeck.
+#
+# Os tiles são gerados a partir da base unida (com índice STRtree por tile),
+# guardados em disco em cache/tiles/<digital dos dados>/... e mantidos num
+# cache LRU em memória. A base é acompanhada por um atualizador sem pasta de
+# entrada (quem aplica as publicações do TSE é o painel): ele só recarrega a
+# base quando as fontes mudam. A digital (também o ETag) vem das assinaturas
+# das fontes do instantâneo servido; uma nova versão muda os caminhos.
+#
+# Uso (o painel usa PAINEL_TILES_URL, padrão http://localhost:8765):
+#   python servidor_tiles.py [--porta 8765]
+
+PASTA_TILES = os.path.join(PASTA_CACHE, 'tiles')
+VERSAO_TILES = 2
+EXTENSAO = 4096
+MARGEM = 64 / EXTENSAO  # Margem do recorte, em fração do tile
+TIPO_MVT = 'application/vnd.mapbox-vector-tile'
+LIMITE_MEMORIA_MB = float(os.environ.get('PAINEL_TILES_MEMORIA_MB', 64))
+
+logger = logging.getLogger('painel.tiles')
+
+
+# Limites do tile z/x/y em Web Mercator (EPSG:3857)
+def limites_tile(z, x, y):
+    tamanho = 2 * math.pi * RAIO_TERRA / 2 ** z
+    origem = math.pi * RAIO_TERRA
+    return (-origem + x * tamanho, origem - (y + 1) * tamanho,
+            -origem + (x + 1) * tamanho, origem - y * tamanho)
+
+
+class FonteTiles:
+    def __init__(self, instantaneo, digital):
+        df = instantaneo.df
+        self.versao = instantaneo.versao
+        self.digital = digital
+        self.df = df
+        x, y = mercator(df['lon'], df['lat'])
+        self.pontos = shapely.points(x, y)
+        self.arvore_pontos = shapely.STRtree(self.pontos)
+        self.colunas_votos = set(colunas_votos(df))
+        self.niveis = {}
+        self._trava = threading.Lock()
+
+    def nivel(self, zoom):
+        nivel = nivel_para_zoom(zoom)
+        with self._trava:
+            if nivel not in self.niveis:
+                bairros = ler_nivel(nivel)
+                geometrias = shapely.transform(bairros.geometry.values, lambda c: np.column_stack(mercator(c[:, 0], c[:, 1])))
+                self.niveis[nivel] = (bairros, geometrias, shapely.STRtree(geometrias))
+            return self.niveis[nivel]
+
+    def locais(self, voto, limites):
+        folga = (limites[2] - limites[0]) * MARGEM
+        dentro = self.arvore_pontos.query(shapely.box(limites[0] - folga, limites[1] - folga,
+                                                      limites[2] + folga, limites[3] + folga))
+        linhas = self.df.iloc[np.sort(dentro)]
+        return [{
+            'geometry': ponto,
+            'properties': {
+                'zona': int(zona), 'local': int(local), 'bairro': str(bairro),
+                'votos': int(votos), 'aptos': int(aptos),
+            },
+        } for ponto, zona, local, bairro, votos, aptos in zip(
+            self.pontos[np.sort(dentro)], linhas['zona_eleitoral'], linhas['local_votacao'],
+            linhas['BAIRRO'], linhas[voto], linhas['VOTOS APTOS'])]
+
+    def bairros(self, zoom, limites):
+        bairros, geometrias, arvore = self.nivel(zoom)
+        folga = (limites[2] - limites[0]) * MARGEM
+        recorte = (limites[0] - folga, limites[1] - folga, limites[2] + folga, limites[3] + folga)
+        feicoes = []
+        for i in np.sort(arvore.query(shapely.box(*recorte))):
+            geometria = shapely.clip_by_rect(geometrias[i], *recorte)
+            if geometria.is_empty:
+                continue
+            feicoes.append({
+                'geometry': geometria,
+                'properties': {'id_bairro': int(bairros['id_bairro'].iat[i]), 'nome': str(bairros['NOME'].iat[i])},
+            })
+        return feicoes
+
+
+def codificar(nome_camada, feicoes, limites):
+    return mapbox_vector_tile.encode(
+        [{'name': nome_camada, 'features': feicoes}],
+        default_options={'quantize_bounds': limites, 'extents': EXTENSAO},
+    )
+
+
+class ServicoTiles:
+    def __init__(self, votes_path, geojson_path, pasta=PASTA_TILES, limite_mb=LIMITE_MEMORIA_MB):
+        self.atualizador = Atualizador(votes_path, geojson_path, pasta_entrada=None,
+                                       bairros_path=DIVISA_BAIRROS).iniciar()
+        self.pasta = pasta
+        self.memoria = CacheResultados(limite_mb=limite_mb, ttl=0)
+        self._fonte = None
+        self._trava = threading.Lock()
+
+    def fonte(self):
+        instantaneo = self.atualizador.atual()
+        with self._trava:
+            fonte = self._fonte
+            if fonte is None or fonte.versao != instantaneo.versao:
+                # Digital das fontes com que este instantâneo foi carregado
+                h = hashlib.sha1(str(VERSAO_TILES).encode())
+                for caminho, assinatura in sorted(instantaneo.fontes.items()):
+                    h.update(repr((caminho, assinatura)).encode())
+                fonte = self._fonte = FonteTiles(instantaneo, h.hexdigest()[:12])
+            return fonte
+
+    def caminho(self, fonte, partes):
+        return os.path.join(self.pasta, fonte.digital, *partes) + '.pbf'
+
+    # partes: ('locais', voto, z, x, y) ou ('bairros', z, x, y); devolve o
+    # conteúdo e o ETag (digital dos dados + caminho do tile)
+    def tile(self, partes):
+        fonte = self.fonte()
+        # O tipo de voto vira parte do caminho em disco: só colunas de votos
+        if partes[0] == 'locais' and partes[1] not in fonte.colunas_votos:
+            raise KeyError(partes[1])
+        conteudo = self.memoria.obter((fonte.digital,) + partes, lambda: self._tile_disco(fonte, partes))
+        etag = hashlib.sha1(repr((fonte.digital,) + partes).encode()).hexdigest()[:16]
+        return conteudo, f'"{etag}"'
+
+    def _tile_disco(self, fonte, partes):
+        destino = self.caminho(fonte, [str(p) for p in partes])
+        if os.path.exists(destino):
+            with open(destino, 'rb') as f:
+                return f.read()
+        camada, z, x, y = partes[0], *partes[-3:]
+        limites = limites_tile(z, x, y)
+        if camada == 'locais':
+            conteudo = codificar('locais', fonte.locais(partes[1], limites), limites)
+        else:
+            conteudo = codificar('bairros', fonte.bairros(z, limites), limites)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        with open(destino + '.tmp', 'wb') as f:
+            f.write(conteudo)
+        os.replace(destino + '.tmp', destino)
+        return conteudo
+
+
+def interpretar_caminho(caminho):
+    partes = [unquote(p) for p in caminho.split('?')[0].strip('/').split('/')]
+    if not partes[-1].endswith('.pbf'):
+        return None
+    partes[-1] = partes[-1][:-len('.pbf')]
+    try:
+        if partes[0] == 'locais' and len(partes) == 5:
+            return ('locais', partes[1]) + tuple(int(p) for p in partes[2:])
+        if partes[0] == 'bairros' and len(partes) == 4:
+            return ('bairros',) + tuple(int(p) for p in partes[1:])
+    except ValueError:
+        return None
+    return None
+
+
+def criar_manipulador(servico):
+    class Manipulador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            partes = interpretar_caminho(self.path)
+            if partes is None:
+                self.send_error(404)
+                return
+            try:
+                conteudo, etag = servico.tile(partes)
+            except KeyError:
+                self.send_error(404, "tipo de voto desconhecido")
+                return
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', TIPO_MVT)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(conteudo)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Cache-Control', 'public, max-age=60')
+            self.end_headers()
+            self.wfile.write(conteudo)
+
+        def log_message(self, formato, *args):
+            logger.debug(formato, *args)
+
+    return Manipulador
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servidor local de tiles vetoriais (MVT) do painel")
+    parser.add_argument('--votos', default='votos_cwb_pref1T_locvot.csv')
+    parser.add_argument('--locais', default='locais_votacao.geojson')
+    parser.add_argument('--porta', type=int, default=8765)
+    args = parser.parse_args()
+
+    servico = ServicoTiles(args.votos, args.locais)
+    servidor = ThreadingHTTPServer(('', args.porta), criar_manipulador(servico))
+    print(f"Tiles em http://localhost:{args.porta}/locais/<tipo de voto>/{{z}}/{{x}}/{{y}}.pbf")
+    servidor.serve_forever()
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filtro_tabela import mascara_filtro, separar_filtro
+
+# Consultas no formato do filter_query da DataTable do Dash
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'zon_loc': ['1_1244', '1_1252', '2_1015', '10_20'],
+        'nr_zona': [1, 1, 2, 10],
+        'VOTOS APTOS': [5013, 1658, 2200, 900],
+        'nome': ['le monde', 'Escola "Central"', 'ponte alta', 'GE 10'],
+    })
+
+
+def linhas(df, consulta):
+    return np.flatnonzero(mascara_filtro(df, consulta)).tolist()
+
+
+@pytest.mark.parametrize('parte, esperado', [
+    ('{VOTOS APTOS} > 2000', ('VOTOS APTOS', 'gt', '2000')),
+    ('{VOTOS APTOS} >= 2000', ('VOTOS APTOS', 'ge', '2000')),
+    ('{VOTOS APTOS} gt 2000', ('VOTOS APTOS', 'gt', '2000')),
+    ('{nr_zona} != 1', ('nr_zona', 'ne', '1')),
+    ('{zon_loc} = 1_1244', ('zon_loc', 'eq', '1_1244')),
+    ('{zon_loc} contains 1_1', ('zon_loc', 'contains', '1_1')),
+    ('{nome} eq "le monde"', ('nome', 'eq', 'le monde')),
+    ("{nome} contains 'ge '", ('nome', 'contains', 'ge ')),
+    ('{nome} eq "Escola \\"Central\\""', ('nome', 'eq', 'Escola "Central"')),
+    ('{nome} datestartswith 2024', ('nome', 'datestartswith', '2024')),
+])
+def test_separar_filtro(parte, esperado):
+    assert tuple(separar_filtro(parte)) == esperado
+
+
+def test_operador_desconhecido():
+    assert separar_filtro('{nome} is blank') == [None] * 3
+    assert separar_filtro('sem coluna') == [None] * 3
+
+
+def test_comparacoes_numericas(df):
+    assert linhas(df, '{VOTOS APTOS} > 2000') == [0, 2]
+    assert linhas(df, '{VOTOS APTOS} >= 2200') == [0, 2]
+    assert linhas(df, '{VOTOS APTOS} lt 1658') == [3]
+    assert linhas(df, '{VOTOS APTOS} le 1658') == [1, 3]
+    assert linhas(df, '{nr_zona} eq 1') == [0, 1]
+    assert linhas(df, '{nr_zona} ne 1') == [2, 3]
+    # Comparação numérica, não de texto ('10' < '2' como texto)
+    assert linhas(df, '{nr_zona} > 2') == [3]
+
+
+def test_operando_nao_numerico_em_coluna_numerica_e_ignorado(df):
+    assert linhas(df, '{nr_zona} > abc') == [0, 1, 2, 3]
+
+
+def test_colunas_de_texto(df):
+    assert linhas(df, '{zon_loc} eq 1_1244') == [0]
+    assert linhas(df, '{zon_loc} = "2_1015"') == [2]
+    assert linhas(df, '{zon_loc} ne 1_1244') == [1, 2, 3]
+    # Ordem de texto
+    assert linhas(df, '{zon_loc} > 1_2') == [2]
+
+
+def test_contains(df):
+    assert linhas(df, '{zon_loc} contains 1_1') == [0, 1]
+    # Em coluna numérica, contains procura no texto do número
+    assert linhas(df, '{nr_zona} contains 1') == [0, 1, 3]
+    assert linhas(df, '{VOTOS APTOS} contains 0') == [0, 2, 3]
+    assert linhas(df, '{nome} contains "ponte alta"') == [2]
+
+
+def test_valor_com_texto_de_operador(df):
+    assert linhas(df, '{nome} eq "le monde"') == [0]
+    assert linhas(df, "{nome} contains 'GE '") == [3]
+    assert linhas(df, '{nome} eq "Escola \\"Central\\""') == [1]
+
+
+def test_partes_combinadas_e_colunas_desconhecidas(df):
+    assert linhas(df, '{nr_zona} eq 1 && {VOTOS APTOS} > 2000') == [0]
+    assert linhas(df, '{inexistente} eq 1 && {zon_loc} contains 2_') == [2]
+    assert linhas(df, '') == [0, 1, 2, 3]
+    assert linhas(df, None) == [0, 1, 2, 3]
@@ -0,0 +1,137 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import incremental
+from ingestao import agregar_secoes, montar_pivot
+
+# Reagregação incremental comparada com a reconstrução completa
+# (agregar_secoes + montar_pivot) sobre cargas sintéticas no formato do TSE
+
+CANDIDATOS = ['ANA', 'BRUNO', 'ROBERTO REQUIÃO', 'VOTO BRANCO', 'VOTO NULO']
+
+
+# Uma linha por (seção, votável), como no arquivo de votação por seção
+def gerar_secoes(locais, semente, carga='01/01/2024 10:00:00'):
+    rng = np.random.default_rng(semente)
+    linhas = []
+    for nr_zona, nr_local_votacao, secoes in locais:
+        for nr_secao in secoes:
+            votos = rng.integers(0, 200, len(CANDIDATOS))
+            aptos = int(votos.sum() + rng.integers(0, 100))
+            for nome, qt_votos in zip(CANDIDATOS, votos):
+                linhas.append({
+                    'nr_zona': nr_zona, 'nr_secao': nr_secao, 'nr_local_votacao': nr_local_votacao,
+                    'nm_votavel': nome, 'qt_aptos': aptos, 'qt_abstencoes': aptos - int(votos.sum()),
+                    'qt_votos_nominais': int(votos[:3].sum()), 'qt_votos': int(qt_votos), 'dt_carga': carga,
+                })
+    return pd.DataFrame(linhas)
+
+
+def gravar(secoes, caminho):
+    secoes.to_csv(caminho, sep=';', encoding='latin1', index=False)
+    return str(caminho)
+
+
+def reconstruir(caminho):
+    return montar_pivot(agregar_secoes(caminho))
+
+
+def ler_saida(caminho):
+    return pd.read_csv(caminho, dtype={'zon_loc': str})
+
+
+def comparar(saida, caminho):
+    esperado = reconstruir(caminho).reset_index(drop=True)
+    obtido = ler_saida(saida)
+    pd.testing.assert_frame_equal(obtido, esperado, check_like=True, check_dtype=False)
+
+
+LOCAIS = [
+    (1, 1244, [1, 2, 3]),
+    (1, 1252, [4, 5]),
+    (2, 1015, [10, 11]),
+]
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    # Estados em tmp_path/cache; sem base de seções do painel
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_primeira_carga_igual_a_reconstrucao(pasta):
+    carga = gravar(gerar_secoes(LOCAIS, 1), pasta / 'carga1.csv')
+    assert incremental.atualizar_incremental(carga, 'saida.csv') == 3
+    comparar('saida.csv', carga)
+
+
+def test_segunda_carga_reescreve_so_os_locais_afetados(pasta):
+    primeira = gerar_secoes(LOCAIS, 1)
+    incremental.atualizar_incremental(gravar(primeira, pasta / 'carga1.csv'), 'saida.csv')
+
+    # Seção 4 (local 1252) republicada com outra dt_carga e novos votos, e
+    # um local novo na zona 2; as demais seções não mudam
+    alterada = gerar_secoes([(1, 1252, [4])], 7, carga='02/01/2024 10:00:00')
+    nova = gerar_secoes([(2, 1023, [12])], 8, carga='02/01/2024 10:00:00')
+    segunda = pd.concat([primeira[primeira['nr_secao'] != 4], alterada, nova], ignore_index=True)
+    carga2 = gravar(segunda, pasta / 'carga2.csv')
+
+    antes = ler_saida('saida.csv').set_index('zon_loc')
+    assert incremental.atualizar_incremental(carga2, 'saida.csv') == 2
+    comparar('saida.csv', carga2)
+
+    # Locais não afetados ficam com as mesmas linhas
+    depois = ler_saida('saida.csv').set_index('zon_loc')
+    for zon_loc in ['1_1244', '2_1015']:
+        pd.testing.assert_series_equal(depois.loc[zon_loc], antes.loc[zon_loc])
+
+    # A mesma carga de novo não muda nada
+    assert incremental.atualizar_incremental(carga2, 'saida.csv') == 0
+    comparar('saida.csv', carga2)
+
+
+def test_secao_que_muda_de_local(pasta):
+    primeira = gerar_secoes(LOCAIS, 1)
+    incremental.atualizar_incremental(gravar(primeira, pasta / 'carga1.csv'), 'saida.csv')
+
+    # A seção 3 passa do local 1244 para o 1252: os dois locais são refeitos
+    movida = gerar_secoes([(1, 1252, [3])], 9, carga='02/01/2024 10:00:00')
+    segunda = pd.concat([primeira[primeira['nr_secao'] != 3], movida], ignore_index=True)
+    carga2 = gravar(segunda, pasta / 'carga2.csv')
+    assert incremental.atualizar_incremental(carga2, 'saida.csv') == 2
+    comparar('saida.csv', carga2)
+
+
+def test_estado_separado_por_saida(pasta):
+    turno1 = gravar(gerar_secoes(LOCAIS, 1), pasta / 'turno1.csv')
+    turno2 = gravar(gerar_secoes(LOCAIS, 2), pasta / 'turno2.csv')
+    incremental.atualizar_incremental(turno1, 'saida_1T.csv')
+    incremental.atualizar_incremental(turno2, 'saida_2T.csv')
+
+    assert os.path.exists(incremental.caminho_estado('saida_1T.csv'))
+    assert os.path.exists(incremental.caminho_estado('saida_2T.csv'))
+    assert incremental.atualizar_incremental(turno1, 'saida_1T.csv') == 0
+    comparar('saida_1T.csv', turno1)
+    comparar('saida_2T.csv', turno2)
+
+
+def test_estado_nao_e_gravado_se_a_reescrita_falhar(pasta, monkeypatch):
+    carga = gravar(gerar_secoes(LOCAIS, 1), pasta / 'carga1.csv')
+
+    def falhar(*args):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(incremental, 'reescrever_locais', falhar)
+    with pytest.raises(OSError):
+        incremental.atualizar_incremental(carga, 'saida.csv')
+    assert not os.path.exists(incremental.caminho_estado('saida.csv'))
+
+    # Na execução seguinte as mesmas seções são aplicadas
+    monkeypatch.undo()
+    monkeypatch.chdir(pasta)
+    assert incremental.atualizar_incremental(carga, 'saida.csv') == 3
+    comparar('saida.csv', carga)
@@ -2,31 +2,15 @@ import dash
 from dash import dcc, html
 from dash import dash_table
 from dash.dependencies import Input, Output
-import pandas as pd
+import numpy as np
 import dash_bootstrap_components as dbc
 
-# Carregar o CSV em um DataFrame
-df = pd.read_csv('votacao_secao-zona_2024_pr_curitiba.csv',delimiter=';', encoding='latin1')
-df = df.drop(['aa_eleicao', 'cd_tipo_eleicao', 'nm_tipo_eleicao', 'cd_eleicao',
-       'ds_eleicao', 'dt_eleicao', 'sg_uf', 'cd_municipio', 'nm_municipio',
-       'nm_local_votacao', 'ds_local_votacao_endereco', 'nr_secao',
-       'sq_candidato', 'dt_carga', 'ds_cargo'   ], axis=1)
-df = df.groupby(['nr_zona', 'nr_local_votacao', 'nm_votavel'])[['qt_aptos', 'qt_abstencoes','qt_votos_nominais', 'qt_votos']].sum().reset_index()
-df_agrupado = df.groupby(['nr_zona', 'nr_local_votacao', 'nm_votavel']).agg({
-    'qt_votos': 'sum'     
-}).reset_index()
-df_agrupado['zon_loc'] =  df_agrupado['nr_zona'].astype(str).str.cat(df_agrupado['nr_local_votacao'].astype(str), sep='_')
+from filtro_tabela import mascara_filtro
+from ingestao import agregar_secoes, montar_pivot
 
-df_agrupado2 = df.groupby(['nr_zona', 'nr_local_votacao' ]).agg({
-    'qt_aptos': 'max',
-    'qt_abstencoes': 'max',
-    'qt_votos_nominais': 'max'     
-}).reset_index()
-df_agrupado2['zon_loc'] =  df_agrupado2['nr_zona'].astype(str).str.cat(df_agrupado2['nr_local_votacao'].astype(str), sep='_')
-df_agrupado2 = df_agrupado2.drop(['nr_zona', 'nr_local_votacao'], axis=1)
-
-df_pivot = df_agrupado.pivot_table(index=['nr_local_votacao', 'nr_zona','zon_loc'], columns='nm_votavel', values='qt_votos', aggfunc='sum', fill_value=0).reset_index()
-df_junto = pd.merge(df_agrupado2, df_pivot, on='zon_loc', how='inner')
+# Carregar o CSV por blocos, agregando por local de votação e candidato
+df = agregar_secoes('votacao_secao-zona_2024_pr_curitiba.csv')
+df_junto = montar_pivot(df)
 
 # Iniciar o aplicativo Dash
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
@@ -56,28 +40,59 @@ app.layout = dbc.Container([
     dash_table.DataTable(
         id='table',
         columns=[{"name": col, "id": col} for col in df_junto.columns],
-        data=df_junto.to_dict('records'),
-        filter_action="native",   # Permite filtragem nativa
-        sort_action="native",     # Permite ordenação nativa
-        page_size=10              # Define o número de linhas por página
+        page_current=0,
+        page_size=10,             # Define o número de linhas por página
+        page_action="custom",     # Paginação, filtragem e ordenação feitas
+        filter_action="custom",   # no servidor: o navegador recebe apenas
+        sort_action="custom",     # as linhas da página atual
+        sort_mode="multi",
+        sort_by=[]
     )
 ])
 
 # Callbacks para atualizar a tabela com base nos filtros
 @app.callback(
     Output('table', 'data'),
+    Output('table', 'page_count'),
+    Output('table', 'page_current'),
     Input('nr_local_votacao', 'value'),
-    Input('nr_zona', 'value')
+    Input('nr_zona', 'value'),
+    Input('table', 'page_current'),
+    Input('table', 'page_size'),
+    Input('table', 'sort_by'),
+    Input('table', 'filter_query')
 )
-def update_table(nr_local_votacao, nr_zona):
-    filtered_df = df_junto.copy()
+def update_table(nr_local_votacao, nr_zona, page_current, page_size, sort_by, filter_query):
+    mascara = mascara_filtro(df_junto, filter_query)
 
     if nr_local_votacao:
-        filtered_df = filtered_df[filtered_df['nr_local_votacao'].isin(nr_local_votacao)]
+        mascara &= df_junto['nr_local_votacao'].isin(nr_local_votacao).to_numpy()
     if nr_zona:
-        filtered_df = filtered_df[filtered_df['nr_zona'].isin(nr_zona)]
-        
-    return filtered_df.to_dict('records')
+        mascara &= df_junto['nr_zona'].isin(nr_zona).to_numpy()
+
+    # Posições das linhas selecionadas, sem copiar o DataFrame
+    posicoes = np.flatnonzero(mascara)
+
+    if sort_by:
+        # Ordena apenas as colunas de ordenação das linhas selecionadas
+        colunas = [criterio['column_id'] for criterio in sort_by]
+        crescente = [criterio['direction'] == 'asc' for criterio in sort_by]
+        ordem = (df_junto[colunas].iloc[posicoes].reset_index(drop=True)
+                 .sort_values(colunas, ascending=crescente, kind='stable').index.to_numpy())
+        posicoes = posicoes[ordem]
+
+    page_size = page_size or 10
+    page_count = max(1, -(-len(posicoes) // page_size))
+    # Novo conjunto de linhas (dropdowns ou filtro): volta à primeira página;
+    # em qualquer caso, não passa da última
+    disparos = dash.ctx.triggered_prop_ids
+    if any(prop in disparos for prop in ('nr_local_votacao.value', 'nr_zona.value', 'table.filter_query')):
+        page_current = 0
+    page_current = min(page_current or 0, page_count - 1)
+    inicio = page_current * page_size
+    pagina = df_junto.iloc[posicoes[inicio:inicio + page_size]]
+
+    return pagina.to_dict('records'), page_count, page_current
 
 # Rodar o aplicativo
 if __name__ == '__main__':
@@ -0,0 +1,194 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from chaves import chave_local
+from dados import PASTA_CACHE
+from esquema import TIPO_CONTAGEM, colunas_votos
+from ingestao import BRANCOS_NULOS, NOMES_TOTAIS, TAMANHO_BLOCO, agregar_secoes
+
+# Base de votos em formato longo: uma linha por (local de votação, votável)
+# com o número de votos, em vez de uma coluna por candidato. Os votáveis
+# ficam numa tabela à parte (código, nome, tipo), então uma nova eleição ou
+# uma disputa de vereador com centenas de nomes não muda o código nem alarga
+# a tabela; pares sem voto simplesmente não têm linha.
+#
+# As linhas ficam ordenadas por (id_local, votável), com ponteiros por local
+# (formato CSR) e uma segunda ordenação por votável, de modo que "votos do
+# local X" e "votos do candidato Y em todos os locais" são fatias contíguas.
+
+CACHE_VOTOS_LONGOS = os.path.join(PASTA_CACHE, 'votos_longos.parquet')
+
+# Tipos de votável, na ordem em que aparecem nos seletores
+QUANTIDADES_LOCAL = list(NOMES_TOTAIS.values())   # aptos, abstenções, nominais
+TIPOS_VOTAVEL = ['quantidade', 'branco_nulo', 'candidato']
+
+
+def tipo_votavel(nome):
+    if nome in QUANTIDADES_LOCAL:
+        return 'quantidade'
+    if nome in BRANCOS_NULOS:
+        return 'branco_nulo'
+    return 'candidato'
+
+
+def ordem_votavel(nome):
+    if nome in QUANTIDADES_LOCAL:
+        return (0, QUANTIDADES_LOCAL.index(nome), nome)
+    if nome in BRANCOS_NULOS:
+        return (1, BRANCOS_NULOS.index(nome), nome)
+    return (2, 0, nome)
+
+
+class VotosLongos:
+    def __init__(self, id_local, id_votavel, votos, nomes):
+        ordem = np.lexsort((id_votavel, id_local))
+        self.id_local = np.asarray(id_local, dtype=np.int64)[ordem]
+        self.id_votavel = np.asarray(id_votavel, dtype=np.int32)[ordem]
+        self.votos = np.asarray(votos).astype(TIPO_CONTAGEM)[ordem]
+        self.votaveis = pd.DataFrame({'nome': list(nomes)})
+        self.votaveis['tipo'] = self.votaveis['nome'].map(tipo_votavel)
+        self.codigos = {nome: i for i, nome in enumerate(self.votaveis['nome'])}
+
+        # Ponteiros por local: linhas de locais[i] em [inicio[i], inicio[i + 1])
+        self.locais, inicio = np.unique(self.id_local, return_index=True)
+        self.inicio = np.append(inicio, len(self.id_local))
+
+        # Segunda ordenação, por votável
+        self.por_votavel = np.argsort(self.id_votavel, kind='stable')
+        self.inicio_votavel = np.searchsorted(self.id_votavel[self.por_votavel], np.arange(len(self.votaveis) + 1))
+
+    def __len__(self):
+        return len(self.id_local)
+
+    # Nomes oferecidos nos seletores: quantidades, brancos/nulos e candidatos
+    def opcoes(self, tipos=TIPOS_VOTAVEL):
+        nomes = self.votaveis.loc[self.votaveis['tipo'].isin(tipos), 'nome']
+        return sorted(nomes, key=ordem_votavel)
+
+    def votos_do_local(self, id_local):
+        i = np.searchsorted(self.locais, id_local)
+        if i == len(self.locais) or self.locais[i] != id_local:
+            return pd.Series(dtype=TIPO_CONTAGEM)
+        linhas = slice(self.inicio[i], self.inicio[i + 1])
+        return pd.Series(self.votos[linhas], index=self.votaveis['nome'].to_numpy()[self.id_votavel[linhas]])
+
+    # Votos de um votável em cada local (0 onde não há linha), alinhados a
+    # 'locais' (padrão: todos os locais da base, em ordem)
+    def votos_do_votavel(self, nome, locais=None):
+        locais = self.locais if locais is None else np.asarray(locais, dtype=np.int64)
+        codigo = self.codigos.get(nome)
+        resultado = np.zeros(len(locais), dtype=TIPO_CONTAGEM)
+        if codigo is None:
+            return pd.Series(resultado, index=locais)
+        linhas = self.por_votavel[self.inicio_votavel[codigo]:self.inicio_votavel[codigo + 1]]
+        posicao = pd.Index(locais).get_indexer(self.id_local[linhas])
+        dentro = posicao >= 0
+        resultado[posicao[dentro]] = self.votos[linhas][dentro]
+        return pd.Series(resultado, index=locais)
+
+    # Totais por votável, opcionalmente por região: 'regioes' é uma Series
+    # id_local -> região (zona, bairro...); locais fora dela são ignorados
+    def totais(self, regioes=None, nomes=None):
+        linhas = np.ones(len(self), dtype=bool)
+        if nomes is not None:
+            linhas &= np.isin(self.id_votavel, [self.codigos[n] for n in nomes if n in self.codigos])
+        if regioes is None:
+            soma = np.bincount(self.id_votavel[linhas], weights=self.votos[linhas], minlength=len(self.votaveis))
+            resultado = pd.Series(soma.astype(np.int64), index=self.votaveis['nome'].to_numpy())
+            return resultado if nomes is None else resultado.reindex(nomes)
+
+        regiao_local = regioes.reindex(self.id_local)
+        linhas &= regiao_local.notna().to_numpy()
+        tabela = pd.DataFrame({
+            'regiao': regiao_local.to_numpy()[linhas],
+            'nome': self.votaveis['nome'].to_numpy()[self.id_votavel[linhas]],
+            'votos': self.votos[linhas].astype(np.int64),
+        })
+        return tabela.groupby(['regiao', 'nome'], observed=True, sort=True)['votos'].sum().reset_index()
+
+    # N mais votados de cada local entre os votáveis dos tipos dados
+    def mais_votados(self, n=3, tipos=('candidato',)):
+        codigos = self.votaveis.index[self.votaveis['tipo'].isin(tipos)].to_numpy()
+        linhas = np.flatnonzero(np.isin(self.id_votavel, codigos))
+        # Dentro de cada local (já contíguo), do mais para o menos votado
+        ordem = linhas[np.lexsort((-self.votos[linhas].astype(np.int64), self.id_local[linhas]))]
+        id_local = self.id_local[ordem]
+        primeiro = np.searchsorted(id_local, id_local)
+        posicao = np.arange(len(ordem)) - primeiro + 1
+        manter = posicao <= n
+        ordem = ordem[manter]
+        return pd.DataFrame({
+            'id_local': self.id_local[ordem],
+            'posicao': posicao[manter],
+            'nome': self.votaveis['nome'].to_numpy()[self.id_votavel[ordem]],
+            'votos': self.votos[ordem],
+        })
+
+    # Votos de um votável em % dos votos aptos de cada local
+    def proporcao_eleitorado(self, nome, locais=None, aptos='VOTOS APTOS'):
+        votos = self.votos_do_votavel(nome, locais).to_numpy(dtype=np.float64)
+        eleitorado = self.votos_do_votavel(aptos, locais)
+        proporcao = np.divide(votos * 100, eleitorado.to_numpy(dtype=np.float64),
+                              out=np.zeros(len(votos)), where=eleitorado.to_numpy() > 0)
+        return pd.Series(np.round(proporcao, 1), index=eleitorado.index)
+
+
+# A partir da tabela larga (CSV consolidado ou base unida): uma linha por
+# célula não nula das colunas de votos
+def de_tabela_larga(df):
+    colunas = colunas_votos(df)
+    if 'id_local' in df.columns:
+        id_local = df['id_local'].to_numpy(dtype=np.int64)
+    else:
+        id_local = chave_local(df['nr_zona'], df['nr_local_votacao'])
+    valores = df[colunas].to_numpy()
+    linha, coluna = np.nonzero(valores)
+    return VotosLongos(id_local[linha], coluna, valores[linha, coluna], colunas)
+
+
+# A partir do agregado por (nr_zona, nr_local_votacao, nm_votavel) do TSE,
+# sem passar pela tabela larga
+def de_secoes(agregado):
+    id_local = chave_local(agregado['nr_zona'], agregado['nr_local_votacao'])
+    totais = pd.DataFrame({col: agregado[col].to_numpy() for col in NOMES_TOTAIS}, index=id_local)
+    totais = totais.groupby(level=0).max().rename(columns=NOMES_TOTAIS)
+
+    nomes = QUANTIDADES_LOCAL + sorted(set(agregado['nm_votavel'].astype(str)) - set(QUANTIDADES_LOCAL))
+    codigos = {nome: i for i, nome in enumerate(nomes)}
+    id_local = np.concatenate([np.repeat(totais.index.to_numpy(), len(QUANTIDADES_LOCAL)), id_local])
+    id_votavel = np.concatenate([np.tile(np.arange(len(QUANTIDADES_LOCAL)), len(totais)),
+                                 agregado['nm_votavel'].astype(str).map(codigos).to_numpy()])
+    votos = np.concatenate([totais.to_numpy().ravel(), agregado['qt_votos'].to_numpy()])
+    com_voto = votos > 0
+    return VotosLongos(id_local[com_voto], id_votavel[com_voto], votos[com_voto], nomes)
+
+
+def salvar_votos_longos(base, destino=CACHE_VOTOS_LONGOS):
+    os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+    tabela = pa.table({
+        'id_local': base.id_local,
+        'votavel': pa.DictionaryArray.from_arrays(base.id_votavel, base.votaveis['nome'].tolist()),
+        'votos': base.votos,
+    })
+    pq.write_table(tabela, destino + '.tmp')
+    os.replace(destino + '.tmp', destino)
+
+
+def ler_votos_longos(destino=CACHE_VOTOS_LONGOS):
+    df = pq.read_table(destino, memory_map=True).to_pandas()
+    votavel = df['votavel'].cat
+    return VotosLongos(df['id_local'].to_numpy(), votavel.codes.to_numpy(), df['votos'].to_numpy(), votavel.categories)
+
+
+# Uso (ex.: disputa de vereador direto do arquivo por seção do TSE):
+#   python votos_longos.py votacao_secao-zona_2024_pr_curitiba.csv [destino.parquet]
+if __name__ == '__main__':
+    destino = sys.argv[2] if len(sys.argv) > 2 else CACHE_VOTOS_LONGOS
+    base = de_secoes(agregar_secoes(sys.argv[1], tamanho_bloco=TAMANHO_BLOCO))
+    salvar_votos_longos(base, destino)
+    print(f"{len(base)} linhas, {len(base.locais)} locais, {len(base.votaveis)} votáveis em {destino}")